@@ -1,4 +1,6 @@
 
+import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -33,6 +35,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'shopping.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -66,16 +69,105 @@ WSGI_APPLICATION = 'pdpecommerce.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": "pdpdb",
-        "USER": "postgres",
-        "PASSWORD": "1",
-        "HOST": "localhost",
-        "PORT": "5432",
+# DB_PROFILE=sqlite switches to a local SQLite file for offline work and
+# tests; connection reuse settings apply to both profiles. DB_POOL=1 uses
+# psycopg's connection pool instead of persistent connections.
+
+DB_PROFILE = os.environ.get('DB_PROFILE', 'postgresql')
+DB_POOL = os.environ.get('DB_POOL', '0') == '1'
+
+if DB_PROFILE == 'sqlite':
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+        }
+    }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get('DB_NAME', "pdpdb"),
+            "USER": os.environ.get('DB_USER', "postgres"),
+            "PASSWORD": os.environ.get('DB_PASSWORD', "1"),
+            "HOST": os.environ.get('DB_HOST', "localhost"),
+            "PORT": os.environ.get('DB_PORT', "5432"),
+        }
+    }
+
+DATABASES['default'].update({
+    'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+    'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+})
+
+if DB_POOL and DB_PROFILE != 'sqlite':
+    # Pooled connections are returned to the pool per request, so Django's
+    # own persistence must be off.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '20')),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+        },
     }
+
+
+# Cache
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at e.g.
+# django.core.cache.backends.redis.RedisCache to share it between workers.
+
+LOCMEM_CACHE = 'django.core.cache.backends.locmem.LocMemCache'
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', LOCMEM_CACHE)
+CACHE_LOCATION = os.environ.get('CACHE_LOCATION', 'pdpecommerce')
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+    },
+    # Version stamps and hit/miss counters (shopping.cache). Kept out of the
+    # default cache so catalog entries cannot evict them; shared like it.
+    'meta': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('META_CACHE_LOCATION',
+                                   'pdpecommerce-meta' if CACHE_BACKEND == LOCMEM_CACHE else CACHE_LOCATION),
+    },
+    # Per-SKU available-to-sell counts (shopping.inventory), one entry per
+    # variant viewed; bounded on their own so they cannot crowd out the catalog.
+    'availability': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('AVAILABILITY_CACHE_LOCATION',
+                                   'pdpecommerce-availability' if CACHE_BACKEND == LOCMEM_CACHE else CACHE_LOCATION),
+    },
+    # Serialized per-user order history.
+    'orders': {
+        'BACKEND': os.environ.get('ORDERS_CACHE_BACKEND', LOCMEM_CACHE),
+        'LOCATION': os.environ.get('ORDERS_CACHE_LOCATION', 'pdpecommerce-orders'),
+    },
 }
+# LocMemCache culls a tenth of its entries once MAX_ENTRIES is reached. Other
+# backends take OPTIONS as client arguments (RedisCache passes them to the
+# redis client), so a Redis deployment relies on its own maxmemory /
+# allkeys-lru policy instead. 'meta' holds a few keys per namespace plus one
+# per scoped (per-user) version, so its bound is never reached in practice.
+LOCMEM_CACHE_MAX_ENTRIES = {
+    'default': int(os.environ.get('CACHE_MAX_ENTRIES', 50_000)),
+    'meta': 1_000_000,
+    'availability': int(os.environ.get('AVAILABILITY_CACHE_MAX_ENTRIES', 20_000)),
+    'orders': int(os.environ.get('ORDERS_CACHE_MAX_ENTRIES', 10_000)),
+}
+for alias, max_entries in LOCMEM_CACHE_MAX_ENTRIES.items():
+    if CACHES[alias]['BACKEND'] == LOCMEM_CACHE:
+        CACHES[alias]['OPTIONS'] = {'MAX_ENTRIES': max_entries, 'CULL_FREQUENCY': 10}
+
+CATALOG_CACHE_ALIAS = 'default'
+META_CACHE_ALIAS = 'meta'
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+CACHE_NAMESPACE_ALIASES = {'orders': 'orders', 'availability': 'availability'}
+# Order history embeds live variant data (price, stock), so keep it short.
+ORDER_CACHE_TIMEOUT = 60 * 60
+CACHE_STATS_NAMESPACES = ['categories', 'colors', 'sizes', 'orders', 'favorites', 'facets']
 
 
 # Password validation
@@ -116,4 +208,92 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
-AUTH_USER_MODEL = 'accounts.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'accounts.User'
+
+
+# orjson-backed JSON (shopping.renderers), falling back to stdlib json when
+# orjson is not installed.
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'shopping.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'shopping.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+
+PRODUCT_PAGE_SIZE = 20
+PRODUCT_MAX_PAGE_SIZE = 100
+
+
+# Request instrumentation (shopping.middleware.RequestMetricsMiddleware).
+# Budgets are keyed by URL name; exceeding one logs a warning, or raises
+# QueryBudgetExceeded when QUERY_BUDGET_STRICT is on (useful in tests). Budgets
+# assume a session-authenticated request on a cold cache.
+
+METRICS_WINDOW_SIZE = 1000
+QUERY_BUDGET_STRICT = False
+QUERY_BUDGETS = {
+    'product-list': 4,
+    'product-detail': 7,
+    'category-list': 3,
+    'clothes-list': 4,
+    'cartview-detail': 6,
+    'cartview-add-item': 18,
+    'cartview-remove-item': 16,
+    'cartview-apply-promo': 6,
+    'cartview-checkout': 22,
+    'orderview-list': 6,
+    'favorites-list': 6,
+    'product-facets': 3,
+}
+
+
+# Product list, category product list and cart reads build their JSON from
+# .values() rows (shopping.fast_serializers) instead of ModelSerializers.
+
+FAST_READ_SERIALIZERS = os.environ.get('FAST_READ_SERIALIZERS', '1') == '1'
+
+
+# Valid promo codes are held in process memory per time bucket of this many
+# seconds (shopping.pricing); saving a PromoCode reloads them immediately.
+
+PROMO_CACHE_BUCKET_SECONDS = 60
+
+
+# Retries of checkout/payment carrying the same Idempotency-Key header
+# replay the stored response until the key expires.
+
+IDEMPOTENCY_KEY_TTL = timedelta(hours=24)
+# A key still in progress after this long belongs to a request that died
+# mid-flight and may be claimed again.
+IDEMPOTENCY_LOCK_TIMEOUT = timedelta(minutes=2)
+
+
+# Add-to-cart places a hold on stock instead of decrementing it; holds lapse
+# after STOCK_HOLD_TTL and are swept by `manage.py release_stock_holds`.
+
+STOCK_HOLD_TTL = timedelta(minutes=30)
+STOCK_AVAILABILITY_CACHE_TIMEOUT = 30
+
+
+# Facet counts are cached per filter combination and dropped whenever a
+# product or variant is saved; checkout only updates stock, so counts under
+# ?in_stock=true may lag by up to FACET_CACHE_TIMEOUT seconds.
+
+FACET_CACHE_TIMEOUT = 60
+
+
+# Background tasks (shopping.taskqueue), processed by `manage.py run_worker`.
+
+TASK_RETRY_BASE_DELAY = 10
+TASK_RETRY_MAX_DELAY = 60 * 60
+TASK_STALE_AFTER = timedelta(minutes=10)
+
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'orders@pdpecommerce.local')
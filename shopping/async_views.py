@@ -0,0 +1,76 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch, Q
+from django.http import JsonResponse
+
+from .favorites import favorite_product_ids
+from .inventory import available_to_sell
+from .models import Cart, CartItem, Product, ProductCategory, ProductItem
+from .pagination import decode_keyset, encode_keyset, get_page_size
+from .serializers import CartSerializer, ProductCategorySerializer, ProductDetailSerializer, ProductListSerializer
+
+# Async counterparts of the read-heavy endpoints, for deployment behind
+# pdpecommerce.asgi. They use the async ORM and plain Django views (DRF
+# views are sync-only); serializers only see already-loaded objects.
+
+
+async def product_list(request):
+    queryset = Product.objects.filter(is_active=True).select_related('listing').order_by('-created_at', '-id')
+    page_size = get_page_size(request.GET.get('page_size'))
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            created_at, pk = decode_keyset(cursor)
+        except ValueError:
+            return JsonResponse({'detail': 'Invalid cursor'}, status=404)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    products = [product async for product in queryset[:page_size + 1]]
+    next_url = None
+    if len(products) > page_size:
+        products = products[:page_size]
+        last = products[-1]
+        next_url = request.build_absolute_uri(
+            f'{request.path}?cursor={encode_keyset(last.created_at, last.id)}&page_size={page_size}'
+        )
+
+    favorite_ids = await sync_to_async(favorite_product_ids)(await request.auser())
+    return JsonResponse({'next': next_url, 'results': ProductListSerializer(
+        products, many=True, context={'favorite_ids': favorite_ids}
+    ).data})
+
+
+async def product_detail(request, id):
+    queryset = Product.objects.select_related('category', 'listing').prefetch_related(
+        Prefetch('variants', queryset=ProductItem.objects.select_related('color', 'size'))
+    )
+    try:
+        product = await queryset.aget(id=id)
+    except Product.DoesNotExist:
+        return JsonResponse({'detail': 'No Product matches the given query.'}, status=404)
+    favorite_ids = await sync_to_async(favorite_product_ids)(await request.auser())
+    availability = await sync_to_async(available_to_sell)([variant.id for variant in product.variants.all()])
+    return JsonResponse(ProductDetailSerializer(
+        product, context={'favorite_ids': favorite_ids, 'availability': availability}
+    ).data)
+
+
+async def category_list(request):
+    categories = [category async for category in ProductCategory.objects.all()]
+    return JsonResponse(ProductCategorySerializer(categories, many=True).data, safe=False)
+
+
+async def cart_detail(request, pk):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    queryset = Cart.objects.filter(user=user).select_related('shipping').prefetch_related(
+        Prefetch('items', queryset=CartItem.objects.select_related('product__product'))
+    )
+    try:
+        cart = await queryset.aget(pk=pk)
+    except Cart.DoesNotExist:
+        return JsonResponse({'detail': 'No Cart matches the given query.'}, status=404)
+    await cart.aget_totals()
+    return JsonResponse(CartSerializer(cart).data)
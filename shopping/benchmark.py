@@ -0,0 +1,372 @@
+import asyncio
+import io
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from decimal import Decimal
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import Prefetch
+from django.test import Client
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .fast_serializers import CART_VALUES, cart_data, product_list_data, product_list_values
+from .listing import refresh_listings
+from .metrics import MetricsRegistry
+from .models import Cart, CartItem, Color, Product, ProductCategory, ProductItem, ShippingAddress, Size
+from .renderers import FastJSONParser, FastJSONRenderer
+from .search import refresh_search_documents
+from .serializers import CartSerializer, OrderSerializer, ProductListSerializer
+from .utils import batched
+
+ADJECTIVES = ['Classic', 'Slim', 'Relaxed', 'Vintage', 'Urban', 'Organic', 'Merino', 'Linen', 'Denim', 'Trail']
+NOUNS = ['Shirt', 'Jacket', 'Sneaker', 'Hoodie', 'Chino', 'Parka', 'Loafer', 'Beanie', 'Scarf', 'Boot']
+COLORS = ['Black', 'White', 'Navy', 'Olive', 'Sand', 'Burgundy', 'Grey', 'Teal']
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+
+DEFAULT_MIX = {'browse': 50, 'detail': 20, 'search': 15, 'add_to_cart': 10, 'checkout': 5}
+
+
+def seed_catalog(categories, products, variants, users, prefix='bench', batch_size=1000, rng=None):
+    """Bulk-insert a synthetic catalog plus users with a shipping address and cart."""
+    rng = rng or random.Random(0)
+
+    category_objs = ProductCategory.objects.bulk_create(
+        [ProductCategory(name=f'{prefix}-category-{i}', quantity=0) for i in range(categories)]
+    )
+    colors = [Color.objects.get_or_create(name=name)[0] for name in COLORS]
+    sizes = [Size.objects.get_or_create(name=name, size_type='CL')[0] for name in SIZES]
+
+    product_ids = []
+    for batch in batched(range(products), batch_size):
+        created = Product.objects.bulk_create([
+            Product(
+                name=f'{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {i}',
+                description=f'Synthetic product {i} for load testing.',
+                base_price=Decimal(rng.randint(1000, 20000)) / 100,
+                category=rng.choice(category_objs),
+            )
+            for i in batch
+        ])
+        ProductItem.objects.bulk_create([
+            ProductItem(
+                product=product, sku=f'{prefix.upper()}-{product.id}-{v}',
+                current_price=product.base_price, original_price=product.base_price,
+                stock_quantity=rng.randint(0, 10_000), color=rng.choice(colors), size=rng.choice(sizes),
+            )
+            for product in created for v in range(variants)
+        ])
+        ids = [product.id for product in created]
+        refresh_search_documents(ids)
+        refresh_listings(ids)
+        product_ids.extend(ids)
+
+    for i in range(users):
+        user = User.objects.create_user(f'{prefix}-user-{i}@example.com', 'Bench', str(i), password=None)
+        address = ShippingAddress.objects.create(
+            user=user, recipient_name=f'Bench {i}', street='1 Load St', city='Tashkent', state='TK',
+            postal_code='100000', country='UZ', phone_number='+998000000000', shipping_cost=Decimal('5.00'),
+        )
+        Cart.objects.create(user=user, shipping=address)
+
+    return product_ids
+
+
+class CountingWrapper:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Scenario:
+    def __init__(self, user, cart_id, product_ids, variant_ids, rng):
+        # Server errors (e.g. "database is locked" under concurrency) come back
+        # as 500 responses and are counted, rather than killing the worker.
+        self.client = APIClient(raise_request_exception=False)
+        self.client.force_authenticate(user)
+        self.cart_id = cart_id
+        self.product_ids = product_ids
+        self.variant_ids = variant_ids
+        self.rng = rng
+
+    def browse(self):
+        yield 'product-list', lambda: self.client.get('/api/products/')
+
+    def detail(self):
+        product_id = self.rng.choice(self.product_ids)
+        yield 'product-detail', lambda: self.client.get(f'/api/products/{product_id}/')
+
+    def search(self):
+        term = self.rng.choice(ADJECTIVES + NOUNS)[:self.rng.randint(3, 6)]
+        yield 'product-search', lambda: self.client.get('/api/products/', {'search': term})
+
+    def add_to_cart(self):
+        payload = {'product_id': self.rng.choice(self.variant_ids), 'quantity': 1}
+        yield 'cartview-add-item', lambda: self.client.post(
+            f'/api/cartview/{self.cart_id}/add-item/', payload, format='json')
+
+    def checkout(self):
+        yield from self.add_to_cart()
+        yield 'cartview-checkout', lambda: self.client.post(f'/api/cartview/{self.cart_id}/checkout/')
+
+
+def run_benchmark(total_requests, concurrency, mix=None, seed=0):
+    """
+    Replay ``total_requests`` scenarios drawn from ``mix`` over ``concurrency``
+    threads, each acting as its own user. Returns ``(report, elapsed, errors)``.
+    """
+    mix = mix or DEFAULT_MIX
+    product_ids = list(Product.objects.filter(is_active=True).values_list('id', flat=True))
+    variant_ids = list(ProductItem.objects.filter(stock_quantity__gt=100).values_list('id', flat=True))
+    carts = list(Cart.objects.select_related('user').order_by('id')[:concurrency])
+    if not product_ids or not variant_ids or len(carts) < concurrency:
+        raise ValueError(f'Need a seeded catalog and at least {concurrency} users with carts.')
+
+    results = MetricsRegistry(window_size=total_requests)
+    names, weights = zip(*mix.items())
+
+    def worker(index):
+        # Error counts are kept per thread and merged once the pool is done.
+        errors = Counter()
+        rng = random.Random(seed + index)
+        scenario = Scenario(carts[index].user, carts[index].id, product_ids, variant_ids, rng)
+        share = total_requests // concurrency + (index < total_requests % concurrency)
+        try:
+            for _ in range(share):
+                for label, send in getattr(scenario, rng.choices(names, weights)[0])():
+                    counter = CountingWrapper()
+                    started = time.perf_counter()
+                    with connection.execute_wrapper(counter):
+                        response = send()
+                    results.record(label, latency_ms=(time.perf_counter() - started) * 1000,
+                                   queries=counter.count)
+                    if response.status_code >= 400:
+                        errors[label] += 1
+        finally:
+            connection.close()
+        return errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        errors = sum(pool.map(worker, range(concurrency)), Counter())
+    return results.snapshot(), time.perf_counter() - started, dict(errors)
+
+
+WSGI_PATHS = ['/api/products/', '/api/products/{product_id}/', '/api/category/', '/api/cartview/{cart_id}/']
+ASGI_PATHS = ['/api/async/products/', '/api/async/products/{product_id}/', '/api/async/category/',
+              '/api/async/cartview/{cart_id}/']
+
+
+@contextmanager
+def simulated_db_latency(seconds):
+    """Add a fixed delay to every query, emulating a remote database round trip."""
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        connection.execute_wrappers.append(delay)
+
+    if not seconds:
+        yield
+        return
+    connection_created.connect(install, weak=False)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+
+
+def _session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+def _request_paths(templates, total_requests, product_ids, cart_id, rng):
+    return [rng.choice(templates).format(product_id=rng.choice(product_ids), cart_id=cart_id)
+            for _ in range(total_requests)]
+
+
+def run_wsgi_load(application, paths, concurrency, cookie):
+    """Drive the WSGI application from a pool of ``concurrency`` worker threads."""
+
+    def call(path):
+        environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET', 'HTTP_HOST': 'testserver',
+                   'HTTP_COOKIE': cookie, 'wsgi.input': io.BytesIO()}
+        setup_testing_defaults(environ)
+        status = []
+        started = time.perf_counter()
+        body = application(environ, lambda code, headers, exc_info=None: status.append(int(code[:3])))
+        try:
+            b''.join(body)
+        finally:
+            body.close()
+        return status[0], (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, paths))
+    return results, time.perf_counter() - started
+
+
+def run_asgi_load(application, paths, concurrency, cookie):
+    """Drive the ASGI application from one event loop with ``concurrency`` requests in flight."""
+
+    async def call(path, semaphore):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+        }
+        messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        status = []
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+
+        async with semaphore:
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            return status[0], (time.perf_counter() - started) * 1000
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(call(path, semaphore) for path in paths))
+
+    started = time.perf_counter()
+    results = asyncio.run(main())
+    return results, time.perf_counter() - started
+
+
+def compare_wsgi_asgi(total_requests, concurrency, db_latency=0.0, wsgi_threads=None, seed=0):
+    from pdpecommerce.asgi import application as asgi_application
+    from pdpecommerce.wsgi import application as wsgi_application
+
+    product_ids = list(Product.objects.filter(is_active=True).values_list('id', flat=True)[:1000])
+    cart = Cart.objects.select_related('user').order_by('id').first()
+    if not product_ids or cart is None:
+        raise ValueError('Need a seeded catalog and at least one user with a cart.')
+    cookie = _session_cookie(cart.user)
+
+    report = {}
+    with simulated_db_latency(db_latency):
+        for mode, application, templates, runner, workers in [
+            ('wsgi', wsgi_application, WSGI_PATHS, run_wsgi_load, wsgi_threads or concurrency),
+            ('asgi', asgi_application, ASGI_PATHS, run_asgi_load, concurrency),
+        ]:
+            paths = _request_paths(templates, total_requests, product_ids, cart.id, random.Random(seed))
+            results, elapsed = runner(application, paths, workers, cookie)
+            latencies = MetricsRegistry(window_size=total_requests)
+            for _, latency in results:
+                latencies.record(mode, latency_ms=latency)
+            report[mode] = {
+                'elapsed': elapsed,
+                'throughput': len(results) / elapsed,
+                'errors': sum(code >= 400 for code, _ in results),
+                **latencies.snapshot()[mode],
+            }
+    return report
+
+
+def _best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def compare_serializers(rows=500, repeat=20):
+    """
+    Per-row cost of the ModelSerializers against shopping.fast_serializers,
+    for serialization alone and for fetch + serialize. Best of ``repeat`` runs.
+    The fast cart path loads its items itself, so its serialization figure
+    includes that query.
+    """
+    products = Product.objects.filter(is_active=True).select_related('listing').order_by('-created_at', '-id')
+    carts = Cart.objects.filter(id__in=CartItem.objects.values('cart_id')).select_related('shipping').order_by('id')
+    cart_items = Prefetch('items', queryset=CartItem.objects.select_related('product__product'))
+
+    def load_carts():
+        loaded = list(carts.prefetch_related(cart_items)[:rows])
+        for cart in loaded:
+            cart.get_totals()
+        return loaded
+
+    cases = {
+        'product list': (
+            lambda: list(products[:rows]),
+            lambda objs: ProductListSerializer(objs, many=True).data,
+            lambda: list(product_list_values(products)[:rows]),
+            product_list_data,
+        ),
+        'cart': (
+            load_carts,
+            lambda objs: CartSerializer(objs, many=True).data,
+            lambda: list(carts.values(*CART_VALUES)[:rows]),
+            cart_data,
+        ),
+    }
+
+    report = {}
+    for name, (load_models, serialize_models, load_values, serialize_values) in cases.items():
+        models, values = load_models(), load_values()
+        if not models:
+            continue
+        count = len(models)
+        report[name] = {
+            'rows': count,
+            'serializer_us': _best_of(repeat, lambda: serialize_models(models)) / count * 1e6,
+            'fast_us': _best_of(repeat, lambda: serialize_values(values)) / count * 1e6,
+            'serializer_total_us': _best_of(repeat, lambda: serialize_models(load_models())) / count * 1e6,
+            'fast_total_us': _best_of(repeat, lambda: serialize_values(load_values())) / count * 1e6,
+        }
+    return report
+
+
+def compare_renderers(products=1000, orders=200, repeat=20):
+    """Render and parse time of DRF's stdlib JSON against shopping.renderers on real payloads."""
+    from .views import order_detail_queryset
+
+    payloads = {
+        'product list': ProductListSerializer(
+            Product.objects.select_related('listing').order_by('-created_at', '-id')[:products], many=True
+        ).data,
+        'orders': OrderSerializer(order_detail_queryset().order_by('-created_at')[:orders], many=True).data,
+    }
+
+    report = {}
+    for name, data in payloads.items():
+        if not data:
+            continue
+        body = JSONRenderer().render(data)
+        report[name] = {
+            'items': len(data),
+            'kb': len(body) / 1024,
+            'render_ms': _best_of(repeat, lambda: JSONRenderer().render(data)) * 1000,
+            'fast_render_ms': _best_of(repeat, lambda: FastJSONRenderer().render(data)) * 1000,
+            'parse_ms': _best_of(repeat, lambda: JSONParser().parse(io.BytesIO(body))) * 1000,
+            'fast_parse_ms': _best_of(repeat, lambda: FastJSONParser().parse(io.BytesIO(body))) * 1000,
+        }
+    return report
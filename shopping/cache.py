@@ -0,0 +1,95 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+_MISSING = object()
+
+
+def get_cache(namespace=None):
+    return caches[settings.CACHE_NAMESPACE_ALIASES.get(namespace, settings.CATALOG_CACHE_ALIAS)]
+
+
+def get_meta_cache():
+    return caches[settings.META_CACHE_ALIAS]
+
+
+def _version_key(namespace, scope=None):
+    return f'{namespace}:version' if scope is None else f'{namespace}:{scope}:version'
+
+
+def get_version(namespace, scope=None):
+    # Versions are microsecond timestamps, so they double as Last-Modified,
+    # and a version lost to eviction comes back newer than any stored entry.
+    # ``scope`` gives each e.g. user an independent version in the namespace.
+    cache = get_meta_cache()
+    key = _version_key(namespace, scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace, scope=None):
+    cache = get_meta_cache()
+    key = _version_key(namespace, scope)
+    current = cache.get(key) or 0
+    cache.set(key, max(time.time_ns() // 1000, current + 1), None)
+
+
+def invalidate_on_commit(namespace, scope=None):
+    transaction.on_commit(lambda: bump_version(namespace, scope))
+
+
+def _count(namespace, outcome):
+    # Counters live with the versions, where cached entries cannot evict them.
+    cache = get_meta_cache()
+    key = f'stats:{namespace}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_or_load(namespace, name, loader, timeout=None, scope=None):
+    """Return ``(value, version)``, loading and storing the value on a miss."""
+    cache = get_cache(namespace)
+    version = get_version(namespace, scope)
+    key = f'{namespace}:{name}:{version}' if scope is None else f'{namespace}:{scope}:{name}:{version}'
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        _count(namespace, 'misses')
+        value = loader()
+        cache.set(key, value, settings.CATALOG_CACHE_TIMEOUT if timeout is None else timeout)
+    else:
+        _count(namespace, 'hits')
+    return value, version
+
+
+def cache_stats(namespaces=None):
+    cache = get_meta_cache()
+    stats = {}
+    for namespace in namespaces or settings.CACHE_STATS_NAMESPACES:
+        hits = cache.get(f'stats:{namespace}:hits', 0)
+        misses = cache.get(f'stats:{namespace}:misses', 0)
+        stats[namespace] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return stats
+
+
+def get_colors():
+    from .models import Color
+
+    return get_or_load('colors', 'all', lambda: list(Color.objects.values('id', 'name')))[0]
+
+
+def get_sizes():
+    from .models import Size
+
+    return get_or_load('sizes', 'all', lambda: list(Size.objects.values('id', 'name', 'size_type')))[0]
@@ -0,0 +1,177 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import invalidate_on_commit
+from .listing import refresh_listings
+from .models import Color, Product, ProductCategory, ProductItem, Size
+from .search import refresh_search_documents
+from .utils import batched, parse_bool
+
+FORMATS = ('csv', 'jsonl')
+REQUIRED_FIELDS = ('sku', 'product', 'category', 'current_price', 'stock_quantity')
+ITEM_UPDATE_FIELDS = ['product', 'current_price', 'original_price', 'stock_quantity', 'is_available', 'color', 'size',
+                      'updated_at']
+
+
+def detect_format(path):
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(stream, fmt):
+    """Yield (line_number, raw dict) from a CSV or JSON Lines stream, one line at a time."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as exc:
+                    raise ValueError(f'line {line_number}: invalid JSON ({exc.msg})')
+
+
+def _text(value):
+    return str(value).strip() if value is not None else ''
+
+
+def _decimal(value, field, line_number):
+    try:
+        return Decimal(_text(value))
+    except InvalidOperation:
+        raise ValueError(f'line {line_number}: {field} must be a number, got {value!r}')
+
+
+def parse_rows(rows):
+    """Validate and normalize raw rows into the importer's row shape."""
+    for line_number, row in rows:
+        missing = [field for field in REQUIRED_FIELDS if not _text(row.get(field))]
+        if missing:
+            raise ValueError(f'line {line_number}: missing {", ".join(missing)}')
+        current_price = _decimal(row['current_price'], 'current_price', line_number)
+        stock = _text(row['stock_quantity'])
+        if not stock.isdigit():
+            raise ValueError(f'line {line_number}: stock_quantity must be a non-negative integer, got {stock!r}')
+        yield {
+            'sku': _text(row['sku']),
+            'product': _text(row['product']),
+            'category': _text(row['category']),
+            'description': _text(row.get('description')),
+            'base_price': _decimal(row['base_price'], 'base_price', line_number)
+            if _text(row.get('base_price')) else None,
+            'current_price': current_price,
+            'original_price': _decimal(row['original_price'], 'original_price', line_number)
+            if _text(row.get('original_price')) else current_price,
+            'stock_quantity': int(stock),
+            'is_available': parse_bool(row.get('is_available'), default=True),
+            'color': _text(row.get('color')),
+            'size': _text(row.get('size')),
+            'size_type': _text(row.get('size_type')) or 'CL',
+        }
+
+
+class CatalogImporter:
+    """
+    Upserts ProductItems keyed by SKU in batches. Categories, colors and
+    sizes are resolved through maps loaded once; products are matched on
+    (name, category) one batch at a time, so memory stays flat however
+    long the input is.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.categories = dict(ProductCategory.objects.values_list('name', 'id'))
+        self.colors = dict(Color.objects.values_list('name', 'id'))
+        self.sizes = {(name, size_type): pk for pk, name, size_type in Size.objects.values_list('id', 'name', 'size_type')}
+        self.rows = 0
+        self.products_created = 0
+
+    def category_id(self, name):
+        if name not in self.categories:
+            self.categories[name] = ProductCategory.objects.get_or_create(name=name, defaults={'quantity': 0})[0].id
+        return self.categories[name]
+
+    def color_id(self, name):
+        if not name:
+            return None
+        if name not in self.colors:
+            self.colors[name] = Color.objects.get_or_create(name=name)[0].id
+        return self.colors[name]
+
+    def size_id(self, name, size_type):
+        if not name:
+            return None
+        key = (name, size_type)
+        if key not in self.sizes:
+            self.sizes[key] = Size.objects.get_or_create(name=name, size_type=size_type)[0].id
+        return self.sizes[key]
+
+    def resolve_products(self, rows):
+        wanted = {}
+        for row in rows:
+            wanted[row['product'], self.category_id(row['category'])] = row
+
+        # Several products may share a name and category; the oldest wins.
+        products = {}
+        for pk, name, category_id in Product.objects.filter(
+            name__in={name for name, _ in wanted}, category_id__in={category_id for _, category_id in wanted}
+        ).order_by('-id').values_list('id', 'name', 'category_id'):
+            products[name, category_id] = pk
+
+        # Existing products only take the columns the file actually supplies.
+        now = timezone.now()
+        for field in ('description', 'base_price'):
+            Product.objects.bulk_update(
+                [Product(id=products[key], updated_at=now, **{field: row[field]})
+                 for key, row in wanted.items() if key in products and row[field]],
+                [field, 'updated_at'],
+            )
+
+        created = Product.objects.bulk_create([
+            Product(name=name, category_id=category_id, description=row['description'],
+                    base_price=row['base_price'] or row['current_price'])
+            for (name, category_id), row in wanted.items() if (name, category_id) not in products
+        ])
+        for product in created:
+            products[product.name, product.category_id] = product.id
+        self.products_created += len(created)
+        return products
+
+    def import_batch(self, rows):
+        # A SKU repeated within one batch would hit the same row twice in a
+        # single upsert, which PostgreSQL rejects; the last occurrence wins.
+        rows = list({row['sku']: row for row in rows}.values())
+        with transaction.atomic():
+            products = self.resolve_products(rows)
+            ProductItem.objects.bulk_create(
+                [
+                    ProductItem(
+                        product_id=products[row['product'], self.categories[row['category']]],
+                        sku=row['sku'], current_price=row['current_price'], original_price=row['original_price'],
+                        stock_quantity=row['stock_quantity'], is_available=row['is_available'],
+                        color_id=self.color_id(row['color']), size_id=self.size_id(row['size'], row['size_type']),
+                    )
+                    for row in rows
+                ],
+                update_conflicts=True, unique_fields=['sku'], update_fields=ITEM_UPDATE_FIELDS,
+            )
+            # bulk_create skips the ProductItem signals, so refresh here.
+            product_ids = {products[row['product'], self.categories[row['category']]] for row in rows}
+            refresh_search_documents(product_ids)
+            refresh_listings(product_ids)
+            invalidate_on_commit('facets')
+
+    def run(self, rows, progress=None):
+        started = time.perf_counter()
+        for batch in batched(rows, self.batch_size):
+            self.import_batch(batch)
+            self.rows += len(batch)
+            if progress:
+                progress(self.rows, time.perf_counter() - started)
+        return time.perf_counter() - started
@@ -0,0 +1,64 @@
+import hashlib
+
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def conditional_response(request, etag, last_modified, build_response):
+    """
+    Answer 304 when the client's validators still match, otherwise call
+    ``build_response``. ``last_modified`` is a POSIX timestamp.
+    """
+    etag = quote_etag(etag)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build_response()
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def _validators(parts, modified):
+    etag = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    modified = [value for value in modified if value is not None]
+    return etag, max(modified).timestamp() if modified else None
+
+
+def product_detail_validators(product_id, *extra):
+    """
+    ETag and Last-Modified for a product detail response, from one aggregate
+    query over the product, its variants and their live stock holds. ``extra``
+    is folded into the ETag. Returns None when the product does not exist.
+    """
+    from .cache import get_version
+    from .models import Product, StockHold
+
+    holds = StockHold.objects.filter(product_item__product=OuterRef('pk'), expires_at__gt=timezone.now()) \
+        .values('product_item__product').annotate(total=Sum('quantity')).values('total')
+    row = Product.objects.filter(pk=product_id).annotate(
+        variants_updated_at=Max('variants__updated_at'),
+        stock=Sum('variants__stock_quantity'),
+        variant_count=Count('variants'),
+        held=Subquery(holds),
+    ).values('updated_at', 'variants_updated_at', 'stock', 'variant_count', 'held').first()
+    if row is None:
+        return None
+    # Variants render color and size names, which change without touching the variant rows.
+    parts = ('product', product_id, *row.values(), get_version('colors'), get_version('sizes'), *extra)
+    return _validators(parts, [row['updated_at'], row['variants_updated_at']])
+
+
+def product_list_validators(query_string, *extra):
+    """
+    ETag and Last-Modified for a product list page from the catalog version,
+    which product saves and listing refreshes bump. No query once cached, so
+    revalidating a deep cursor page costs the same as the first page.
+    """
+    from .cache import get_version
+
+    version = get_version('catalog')
+    etag, _ = _validators(('products', query_string, version, *extra), [])
+    return etag, version / 1_000_000
@@ -0,0 +1,49 @@
+import threading
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_lock = threading.Lock()
+_opened = {}
+
+
+def _count_connection(sender, connection, **kwargs):
+    with _lock:
+        _opened[connection.alias] = _opened.get(connection.alias, 0) + 1
+
+
+connection_created.connect(_count_connection, dispatch_uid='shopping.dbstats.count_connection')
+
+
+def connection_stats():
+    """
+    Describe how each database alias reuses connections. ``opened`` counts
+    physical connections made by this process; with pooling, the pool's own
+    counters show saturation (connections in use over ``max_size``).
+    """
+    stats = {}
+    for alias in connections:
+        connection = connections[alias]
+        settings_dict = connection.settings_dict
+        row = {
+            'vendor': connection.vendor,
+            'opened': _opened.get(alias, 0),
+            'conn_max_age': settings_dict['CONN_MAX_AGE'],
+            'health_checks': settings_dict['CONN_HEALTH_CHECKS'],
+        }
+        pool = getattr(connection, 'pool', None) if connection.vendor == 'postgresql' else None
+        if pool is not None:
+            pool_stats = pool.get_stats()
+            in_use = pool_stats.get('pool_size', 0) - pool_stats.get('pool_available', 0)
+            row.update({
+                'mode': 'pool',
+                'pool_size': pool_stats.get('pool_size', 0),
+                'pool_available': pool_stats.get('pool_available', 0),
+                'pool_max': pool_stats['pool_max'],
+                'requests_waiting': pool_stats.get('requests_waiting', 0),
+                'saturation': round(in_use / pool_stats['pool_max'], 4),
+            })
+        else:
+            row['mode'] = 'persistent' if settings_dict['CONN_MAX_AGE'] else 'per-request'
+        stats[alias] = row
+    return stats
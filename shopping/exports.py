@@ -0,0 +1,90 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Order, OrderItem
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_CHUNK_SIZE = 500
+ORDER_FIELDS = ['order_id', 'created_at', 'status', 'customer_email', 'recipient_name', 'street', 'city', 'state',
+                'postal_code', 'country', 'shipping_cost', 'total_price']
+ITEM_FIELDS = ['sku', 'product', 'quantity', 'price_at_purchase', 'line_total']
+CSV_COLUMNS = ORDER_FIELDS + ITEM_FIELDS
+
+
+def date_range_bounds(start, end):
+    """Turn inclusive start/end dates into an aware [start, end) datetime range."""
+    tz = timezone.get_current_timezone()
+    return (timezone.make_aware(datetime.combine(start, time.min), tz),
+            timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz))
+
+
+def export_queryset(start, end):
+    return Order.objects.filter(created_at__gte=start, created_at__lt=end) \
+        .select_related('user', 'shipping') \
+        .prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('product_items__product')
+                                   .order_by('id'))) \
+        .order_by('created_at', 'id')
+
+
+def iter_orders(start, end, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield one dict per order, items included. ``iterator()`` streams rows
+    through a server-side cursor where the backend has one, and runs the
+    items prefetch once per ``chunk_size`` orders.
+    """
+    for order in export_queryset(start, end).iterator(chunk_size=chunk_size):
+        address = order.shipping
+        yield {
+            'order_id': order.id,
+            'created_at': order.created_at,
+            'status': order.status,
+            'customer_email': order.user.email,
+            'recipient_name': address.recipient_name,
+            'street': address.street,
+            'city': address.city,
+            'state': address.state,
+            'postal_code': address.postal_code,
+            'country': address.country,
+            'shipping_cost': order.shipping_cost,
+            'total_price': order.total_price,
+            'items': [
+                {
+                    'sku': item.product_items.sku,
+                    'product': item.product_items.product.name,
+                    'quantity': item.quantity,
+                    'price_at_purchase': item.price_at_purchase,
+                    'line_total': item.subtotal,
+                }
+                for item in order.items.all()
+            ],
+        }
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_lines(orders):
+    """One CSV line per order item, with the order columns repeated."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for order in orders:
+        head = [order[field] for field in ORDER_FIELDS]
+        for item in order['items'] or [dict.fromkeys(ITEM_FIELDS, '')]:
+            yield writer.writerow(head + [item[field] for field in ITEM_FIELDS])
+
+
+def jsonl_lines(orders):
+    for order in orders:
+        yield json.dumps(order, cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_orders(fmt, start, end, chunk_size=EXPORT_CHUNK_SIZE):
+    lines = csv_lines if fmt == 'csv' else jsonl_lines
+    return lines(iter_orders(start, end, chunk_size))
@@ -0,0 +1,116 @@
+import hashlib
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, Exists, F, OuterRef, Q, Value
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+
+from .cache import get_colors, get_or_load, get_sizes
+from .models import ProductItem
+from .utils import parse_bool
+
+# Product-level filters apply to the Product rows; variant filters must all
+# hold on one and the same ProductItem (a red M in stock, not a red S and an
+# M somewhere else), keyed by facet so each facet can drop its own.
+FacetFilters = namedtuple('FacetFilters', 'category variants key')
+
+
+def _ids(params, name):
+    raw = params.get(name, '')
+    try:
+        return sorted({int(value) for value in raw.split(',') if value.strip()})
+    except ValueError:
+        raise ValidationError({name: 'Expected a comma-separated list of IDs.'})
+
+
+def _price(params, name):
+    raw = params.get(name, '').strip()
+    if not raw:
+        return None
+    try:
+        value = Decimal(raw)
+    except InvalidOperation:
+        value = None
+    if value is None or not value.is_finite() or value < 0:
+        raise ValidationError({name: 'Expected a non-negative number.'})
+    return value
+
+
+def parse_facet_filters(params):
+    category = _ids(params, 'category')
+    colors = _ids(params, 'color')
+    sizes = _ids(params, 'size')
+    min_price, max_price = _price(params, 'min_price'), _price(params, 'max_price')
+    in_stock = parse_bool(params.get('in_stock'))
+
+    variants = {}
+    if colors:
+        variants['color'] = Q(color_id__in=colors)
+    if sizes:
+        variants['size'] = Q(size_id__in=sizes)
+    if min_price is not None:
+        variants['min_price'] = Q(current_price__gte=min_price)
+    if max_price is not None:
+        variants['max_price'] = Q(current_price__lte=max_price)
+    if in_stock:
+        variants['in_stock'] = Q(stock_quantity__gt=0)
+    key = f'{category}|{colors}|{sizes}|{min_price}|{max_price}|{in_stock}'
+    return FacetFilters(category, variants, key)
+
+
+class ProductFacetFilter(filters.BaseFilterBackend):
+    """?category=, ?color=, ?size= (comma-separated IDs), ?min_price=, ?max_price= and ?in_stock=true."""
+
+    def filter_queryset(self, request, queryset, view):
+        facets = parse_facet_filters(request.query_params)
+        if facets.category:
+            queryset = queryset.filter(category_id__in=facets.category)
+        if facets.variants:
+            queryset = queryset.filter(Exists(ProductItem.objects.filter(
+                *facets.variants.values(), product=OuterRef('pk'), is_available=True,
+            )))
+        return queryset
+
+
+def _facet_rows(products, facets):
+    # Disjunctive facets: each facet's counts ignore that facet's own filter,
+    # so picking one color still shows how many products the other colors have.
+    # Both facets are grouped in a single UNION ALL query.
+    products = products.order_by().values('id')
+    parts = []
+    for facet in ('color', 'size'):
+        conditions = [q for name, q in facets.variants.items() if name != facet]
+        parts.append(
+            ProductItem.objects.filter(*conditions, is_available=True, product__in=products,
+                                       **{f'{facet}__isnull': False})
+            .annotate(facet=Value(facet), value=F(f'{facet}_id'))
+            .values('facet', 'value').annotate(products=Count('product_id', distinct=True))
+            .values_list('facet', 'value', 'products').order_by()
+        )
+    return list(parts[0].union(*parts[1:], all=True))
+
+
+def facet_counts(products, params, extra=''):
+    """
+    Products per color and per size among ``products`` under the filters in
+    ``params``. Cached per filter combination; ``extra`` must key anything
+    else that already narrowed ``products`` (e.g. the search term).
+    """
+    facets = parse_facet_filters(params)
+    if facets.category:
+        products = products.filter(category_id__in=facets.category)
+    name = hashlib.md5(f'{facets.key}|{extra}'.encode()).hexdigest()
+    rows, _ = get_or_load('facets', name, lambda: _facet_rows(products, facets),
+                          timeout=settings.FACET_CACHE_TIMEOUT)
+
+    counts = {'color': {}, 'size': {}}
+    for facet, value, count in rows:
+        counts[facet][value] = count
+    return {
+        'colors': [dict(color, count=counts['color'][color['id']])
+                   for color in get_colors() if color['id'] in counts['color']],
+        'sizes': [dict(size, count=counts['size'][size['id']])
+                  for size in get_sizes() if size['id'] in counts['size']],
+    }
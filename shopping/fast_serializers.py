@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from .models import CartItem
+from .pricing import active_promo, discount_for
+
+# Read-only fast paths for the hottest list endpoints. They build the same
+# JSON as ProductListSerializer / CartSerializer straight from .values()
+# rows, skipping model instantiation and per-field DRF machinery. Enabled
+# by settings.FAST_READ_SERIALIZERS; keep them in step with the serializers.
+
+CENTS = Decimal('0.01')
+
+PRODUCT_LIST_VALUES = ('id', 'category_id', 'name', 'description', 'base_price', 'created_at',
+                       'listing__min_price', 'listing__max_price', 'listing__in_stock',
+                       'listing__colors', 'listing__sizes')
+CART_VALUES = ('id', 'user_id', 'promo_code_id', 'shipping__shipping_cost')
+CART_ITEM_VALUES = ('id', 'cart_id', 'prod_quant', 'product__sku', 'product__current_price',
+                    'product__product__name')
+
+
+def money(value):
+    # Matches serializers.DecimalField(decimal_places=2) with COERCE_DECIMAL_TO_STRING.
+    return None if value is None else f'{value.quantize(CENTS):f}'
+
+
+def product_list_values(queryset):
+    # Annotations (e.g. search_rank) stay selected so cursor pagination can read them.
+    return queryset.values(*PRODUCT_LIST_VALUES, *queryset.query.annotations)
+
+
+def product_list_data(rows, favorite_ids=frozenset()):
+    return [
+        {
+            'id': row['id'],
+            'category': row['category_id'],
+            'name': row['name'],
+            'description': row['description'],
+            'base_price': money(row['base_price']),
+            'min_price': money(row['listing__min_price']),
+            'max_price': money(row['listing__max_price']),
+            'in_stock': bool(row['listing__in_stock']),
+            'colors': row['listing__colors'] or [],
+            'sizes': row['listing__sizes'] or [],
+            'is_favorite': row['id'] in favorite_ids,
+        }
+        for row in rows
+    ]
+
+
+def cart_data(carts):
+    """Serialize cart rows from ``queryset.values(*CART_VALUES)`` with one query for all their items."""
+    items = {cart['id']: [] for cart in carts}
+    for item in CartItem.objects.filter(cart_id__in=items).order_by('id').values(*CART_ITEM_VALUES):
+        items[item['cart_id']].append(item)
+
+    data = []
+    for cart in carts:
+        lines = [
+            {
+                'id': item['id'],
+                'product': f"{item['product__product__name']} - {item['product__sku']}",
+                'prod_quant': item['prod_quant'],
+                'subtotal': item['prod_quant'] * item['product__current_price'],
+            }
+            for item in items[cart['id']]
+        ]
+        subtotal = sum((line['subtotal'] for line in lines), Decimal('0.00'))
+        discount = discount_for(subtotal, active_promo(cart['promo_code_id']))
+        shipping_cost = cart['shipping__shipping_cost']
+        data.append({
+            'id': cart['id'],
+            'user': cart['user_id'],
+            'items': lines,
+            'subtotal': money(subtotal),
+            'discount': money(discount),
+            'shipping_cost': shipping_cost,
+            'bagtotal': money(subtotal - discount + shipping_cost),
+        })
+    return data
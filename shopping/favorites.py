@@ -0,0 +1,23 @@
+from .cache import get_or_load, get_version
+
+
+def favorite_product_ids(user):
+    """
+    Frozen set of the product IDs ``user`` has favorited, cached per user and
+    invalidated on every Favorite write, so listings flag rows in O(1).
+    """
+    from .models import Favorite
+
+    if not user.is_authenticated:
+        return frozenset()
+    return get_or_load(
+        'favorites', 'ids', lambda: frozenset(
+            Favorite.objects.filter(user=user).order_by().values_list('product_id', flat=True)
+        ),
+        scope=user.pk,
+    )[0]
+
+
+def favorites_version(user):
+    # Part of product ETags: the is_favorite flags differ per user.
+    return get_version('favorites', scope=user.pk) if user.is_authenticated else None
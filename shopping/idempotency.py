@@ -0,0 +1,106 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+# Outcomes a retry can change: conflicts and server errors release the key.
+RETRYABLE_STATUSES = {status.HTTP_409_CONFLICT}
+
+
+def request_fingerprint(request):
+    payload = json.dumps([request.method, request.path, request.data], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _claim(request, scope, key, fingerprint):
+    """
+    Insert an in-progress record for ``key``, or return the existing live one.
+    Expired records, and in-progress ones older than IDEMPOTENCY_LOCK_TIMEOUT
+    (their process died mid-request), are replaced.
+    """
+    now = timezone.now()
+    stale = Q(expires_at__lte=now) | Q(status_code__isnull=True,
+                                      created_at__lte=now - settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    while True:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=request.user, scope=scope, key=key, request_hash=fingerprint,
+                    expires_at=now + settings.IDEMPOTENCY_KEY_TTL,
+                ), True
+        except IntegrityError:
+            record = IdempotencyKey.objects.filter(user=request.user, scope=scope, key=key).first()
+            if record is None:
+                continue
+            if not IdempotencyKey.objects.filter(stale, pk=record.pk).delete()[0]:
+                return record, False
+
+
+def idempotent(scope):
+    """
+    Make a DRF view method replay its stored response when an authenticated
+    client repeats a request with the same ``Idempotency-Key`` header.
+    Responses below 500 are stored, except RETRYABLE_STATUSES; server errors
+    and exceptions release the key for a retry.
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key or not request.user.is_authenticated:
+                return view_method(self, request, *args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return Response({'detail': f'{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            fingerprint = request_fingerprint(request)
+            record, created = _claim(request, scope, key, fingerprint)
+            if not created:
+                if record.request_hash != fingerprint:
+                    return Response({'detail': f'{IDEMPOTENCY_HEADER} was already used for a different request.'},
+                                    status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                if record.status_code is None:
+                    return Response({'detail': 'A request with this key is still being processed.'},
+                                    status=status.HTTP_409_CONFLICT)
+                return Response(record.response_body, status=record.status_code,
+                                headers={'Idempotent-Replayed': 'true'})
+
+            try:
+                response = view_method(self, request, *args, **kwargs)
+            except Exception:
+                record.delete()
+                raise
+
+            if response.status_code >= 500 or response.status_code in RETRYABLE_STATUSES:
+                record.delete()
+            else:
+                record.status_code = response.status_code
+                record.response_body = json.loads(JSONRenderer().render(response.data) or 'null')
+                record.save(update_fields=['status_code', 'response_body'])
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def purge_expired_keys(batch_size=1000):
+    deleted = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+                   .values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import get_cache
+from .models import CartItem, ProductItem, StockHold
+
+
+class InsufficientStock(Exception):
+    def __init__(self, available):
+        super().__init__(f'Only {available} available')
+        self.available = available
+
+
+def _availability_key(product_item_id):
+    return f'ats:{product_item_id}'
+
+
+def invalidate_availability(product_item_ids):
+    keys = [_availability_key(product_item_id) for product_item_id in product_item_ids]
+    transaction.on_commit(lambda: get_cache('availability').delete_many(keys))
+
+
+def held_quantities(product_item_ids, exclude_cart=None, now=None):
+    holds = StockHold.objects.filter(product_item_id__in=product_item_ids, expires_at__gt=now or timezone.now())
+    if exclude_cart is not None:
+        holds = holds.exclude(cart=exclude_cart)
+    return dict(holds.values('product_item_id').annotate(total=Sum('quantity')).values_list('product_item_id', 'total'))
+
+
+def live_held_quantity(product_item_ref, now=None):
+    """Subquery for the quantity held by unexpired holds on the SKU(s) matching ``product_item_ref``."""
+    holds = StockHold.objects.filter(product_item=product_item_ref, expires_at__gt=now or timezone.now())
+    return Coalesce(Subquery(holds.values('product_item').annotate(total=Sum('quantity')).values('total')), 0)
+
+
+def available_to_sell(product_item_ids):
+    """Stock minus live holds per SKU, served from a short-lived cache."""
+    cache = get_cache('availability')
+    keys = {product_item_id: _availability_key(product_item_id) for product_item_id in product_item_ids}
+    cached = cache.get_many(keys.values())
+    result = {product_item_id: cached[key] for product_item_id, key in keys.items() if key in cached}
+
+    missing = [product_item_id for product_item_id in keys if product_item_id not in result]
+    if missing:
+        computed = {
+            product_item_id: max(stock - held, 0)
+            for product_item_id, stock, held in ProductItem.objects.filter(id__in=missing)
+            .annotate(held=live_held_quantity(OuterRef('pk'))).values_list('id', 'stock_quantity', 'held')
+        }
+        cache.set_many({keys[product_item_id]: value for product_item_id, value in computed.items()},
+                       settings.STOCK_AVAILABILITY_CACHE_TIMEOUT)
+        result.update(computed)
+    return result
+
+
+def _add_cart_quantity(cart, product_item_id, quantity):
+    updated = CartItem.objects.filter(cart=cart, product_id=product_item_id).update(prod_quant=F('prod_quant') + quantity)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            CartItem.objects.create(cart=cart, product_id=product_item_id, prod_quant=quantity)
+    except IntegrityError:
+        # A concurrent request created the line first.
+        CartItem.objects.filter(cart=cart, product_id=product_item_id).update(prod_quant=F('prod_quant') + quantity)
+
+
+def reserve(cart, product_item_id, quantity):
+    """
+    Add ``quantity`` of a SKU to ``cart`` and hold stock for the whole cart
+    line. Only that SKU's row is locked. Must run inside a transaction.
+    """
+    now = timezone.now()
+    stock = ProductItem.objects.select_for_update().filter(id=product_item_id) \
+        .values_list('stock_quantity', flat=True).first()
+    if stock is None:
+        raise ProductItem.DoesNotExist
+    held_by_others = held_quantities([product_item_id], exclude_cart=cart, now=now).get(product_item_id, 0)
+    in_cart = CartItem.objects.filter(cart=cart, product_id=product_item_id) \
+        .values_list('prod_quant', flat=True).first() or 0
+
+    available = stock - held_by_others - in_cart
+    if quantity > available:
+        raise InsufficientStock(max(available, 0))
+
+    _add_cart_quantity(cart, product_item_id, quantity)
+    # The SKU row lock serializes holds on this SKU, so the create cannot race.
+    hold = {'quantity': in_cart + quantity, 'expires_at': now + settings.STOCK_HOLD_TTL}
+    if not StockHold.objects.filter(cart=cart, product_item_id=product_item_id).update(**hold):
+        StockHold.objects.create(cart=cart, product_item_id=product_item_id, **hold)
+    invalidate_availability([product_item_id])
+
+
+def set_hold(cart, product_item_id, quantity):
+    """Shrink or drop a cart's hold after its cart line changed to ``quantity``."""
+    holds = StockHold.objects.filter(cart=cart, product_item_id=product_item_id)
+    if quantity > 0:
+        holds.update(quantity=quantity)
+    else:
+        holds.delete()
+    invalidate_availability([product_item_id])
+
+
+def release_cart_holds(cart, product_item_ids):
+    StockHold.objects.filter(cart=cart).delete()
+    invalidate_availability(product_item_ids)
+
+
+def release_expired_holds(batch_size=1000):
+    released = 0
+    while True:
+        rows = list(StockHold.objects.filter(expires_at__lte=timezone.now())
+                    .values_list('id', 'product_item_id')[:batch_size])
+        if not rows:
+            return released
+        with transaction.atomic():
+            released += StockHold.objects.filter(id__in=[row[0] for row in rows]).delete()[0]
+            invalidate_availability({row[1] for row in rows})
@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+from django.db.models import Max, Min, Sum
+
+from .cache import invalidate_on_commit
+
+REFRESH_CHUNK_SIZE = 1000
+LISTING_UPDATE_FIELDS = ['min_price', 'max_price', 'total_stock', 'in_stock', 'colors', 'sizes', 'refreshed_at']
+
+
+def refresh_listings(product_ids):
+    """Recompute the ProductListing rows of the given products from their variants."""
+    from .models import Product, ProductItem, ProductListing
+
+    product_ids = list(set(product_ids))
+    if product_ids:
+        # Product list ETags (shopping.conditional) are built from this version.
+        invalidate_on_commit('catalog')
+    for start in range(0, len(product_ids), REFRESH_CHUNK_SIZE):
+        chunk = list(Product.objects.filter(id__in=product_ids[start:start + REFRESH_CHUNK_SIZE])
+                     .values_list('id', flat=True))
+        available = ProductItem.objects.filter(product_id__in=chunk, is_available=True)
+
+        prices = {
+            row['product_id']: row
+            for row in available.values('product_id').annotate(
+                min_price=Min('current_price'), max_price=Max('current_price'), total_stock=Sum('stock_quantity')
+            )
+        }
+        colors, sizes = defaultdict(set), defaultdict(set)
+        for product_id, color, size in available.filter(stock_quantity__gt=0) \
+                .values_list('product_id', 'color__name', 'size__name').distinct():
+            if color:
+                colors[product_id].add(color)
+            if size:
+                sizes[product_id].add(size)
+
+        listings = []
+        for product_id in chunk:
+            row = prices.get(product_id, {})
+            total_stock = row.get('total_stock') or 0
+            listings.append(ProductListing(
+                product_id=product_id,
+                min_price=row.get('min_price'),
+                max_price=row.get('max_price'),
+                total_stock=total_stock,
+                in_stock=total_stock > 0,
+                colors=sorted(colors[product_id]),
+                sizes=sorted(sizes[product_id]),
+            ))
+        ProductListing.objects.bulk_create(
+            listings, update_conflicts=True, unique_fields=['product'], update_fields=LISTING_UPDATE_FIELDS
+        )
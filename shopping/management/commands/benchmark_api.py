@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shopping.benchmark import DEFAULT_MIX, run_benchmark
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in DEFAULT_MIX or not weight.isdigit():
+            raise CommandError(f'Invalid mix entry {part!r}; use e.g. browse=50,search=20 '
+                               f'with scenarios from {", ".join(DEFAULT_MIX)}')
+        mix[name] = int(weight)
+    return mix
+
+
+class Command(BaseCommand):
+    help = ('Replay a request mix against the API in-process and report throughput, latency '
+            'percentiles and query counts per endpoint. Run seed_catalog first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help='Number of scenarios to replay.')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX,
+                            help='Scenario weights, e.g. browse=50,detail=20,search=15,add_to_cart=10,checkout=5')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the request mix.')
+
+    def handle(self, *args, **options):
+        try:
+            report, elapsed, errors = run_benchmark(options['requests'], options['concurrency'],
+                                                    options['mix'], options['seed'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        total = sum(row['count'] for row in report.values())
+        self.stdout.write(f'{total} requests in {elapsed:.2f}s ({total / elapsed:.1f} req/s), '
+                          f'concurrency {options["concurrency"]}')
+        self.stdout.write(f'{"endpoint":<22}{"count":>7}{"errors":>8}{"p50 ms":>9}{"p95 ms":>9}'
+                          f'{"p99 ms":>9}{"queries":>9}')
+        for label, row in report.items():
+            latency = row['latency_ms']
+            self.stdout.write(
+                f'{label:<22}{row["count"]:>7}{errors.get(label, 0):>8}{latency["p50"]:>9.1f}'
+                f'{latency["p95"]:>9.1f}{latency["p99"]:>9.1f}{row["queries"]["p95"]:>9}'
+            )
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shopping.benchmark import compare_wsgi_asgi
+
+
+class Command(BaseCommand):
+    help = ('Compare a WSGI thread pool against the ASGI application on the read endpoints '
+            '(product list/detail, categories, cart) at a given concurrency. Run seed_catalog first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=200,
+                            help='WSGI worker threads, and ASGI requests in flight.')
+        parser.add_argument('--wsgi-threads', type=int, default=None,
+                            help='Size of the WSGI thread pool (defaults to --concurrency).')
+        parser.add_argument('--db-latency-ms', type=float, default=0.0,
+                            help='Artificial delay added to every query to emulate a remote database.')
+
+    def handle(self, *args, **options):
+        try:
+            report = compare_wsgi_asgi(options['requests'], options['concurrency'],
+                                       db_latency=options['db_latency_ms'] / 1000,
+                                       wsgi_threads=options['wsgi_threads'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(f'{"mode":<6}{"req/s":>9}{"errors":>8}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}')
+        for mode, row in report.items():
+            latency = row['latency_ms']
+            self.stdout.write(f'{mode:<6}{row["throughput"]:>9.1f}{row["errors"]:>8}{latency["p50"]:>9.1f}'
+                              f'{latency["p95"]:>9.1f}{latency["p99"]:>9.1f}')
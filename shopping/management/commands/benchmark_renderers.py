@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shopping.benchmark import compare_renderers
+
+
+class Command(BaseCommand):
+    help = ('Compare DRF\'s stdlib JSON renderer/parser with the orjson-backed ones on product list and '
+            'order payloads built from the database. Run seed_catalog (and benchmark_api for orders) first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement; the best is kept.')
+
+    def handle(self, *args, **options):
+        report = compare_renderers(options['products'], options['orders'], options['repeat'])
+        if not report:
+            raise CommandError('No payloads to render; run seed_catalog first.')
+
+        self.stdout.write(f'{"payload":<14}{"items":>7}{"KiB":>8}{"render ms":>11}{"fast":>8}{"speedup":>9}'
+                          f'{"parse ms":>10}{"fast":>8}{"speedup":>9}')
+        for name, row in report.items():
+            self.stdout.write(
+                f'{name:<14}{row["items"]:>7}{row["kb"]:>8.0f}{row["render_ms"]:>11.2f}{row["fast_render_ms"]:>8.2f}'
+                f'{row["render_ms"] / row["fast_render_ms"]:>8.1f}x{row["parse_ms"]:>10.2f}'
+                f'{row["fast_parse_ms"]:>8.2f}{row["parse_ms"] / row["fast_parse_ms"]:>8.1f}x'
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shopping.benchmark import compare_serializers
+
+
+class Command(BaseCommand):
+    help = ('Compare per-row cost of the DRF serializers with the .values()-based fast read path for the '
+            'product list and cart endpoints. Run seed_catalog (and benchmark_api for filled carts) first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per measurement; the best is kept.')
+
+    def handle(self, *args, **options):
+        report = compare_serializers(options['rows'], options['repeat'])
+        if not report:
+            raise CommandError('Nothing to serialize; run seed_catalog first.')
+
+        self.stdout.write(f'{"endpoint":<14}{"rows":>6}{"serializer us/row":>19}{"fast us/row":>13}{"speedup":>9}'
+                          f'{"with fetch":>12}{"fast":>8}{"speedup":>9}')
+        for name, row in report.items():
+            self.stdout.write(
+                f'{name:<14}{row["rows"]:>6}{row["serializer_us"]:>19.1f}{row["fast_us"]:>13.1f}'
+                f'{row["serializer_us"] / row["fast_us"]:>8.1f}x{row["serializer_total_us"]:>12.1f}'
+                f'{row["fast_total_us"]:>8.1f}{row["serializer_total_us"] / row["fast_total_us"]:>8.1f}x'
+            )
@@ -0,0 +1,79 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.pagination import CursorPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import User
+from shopping.views import CardDetailViewSet, CartViewSet, CategoryProductsViewSet, CategoryViewSet, \
+    FavoritesViewSet, OrderViewSet, ProductDetailView, ProductsView, ShippingViewSet
+
+VIEWS = [
+    ('product-list', ProductsView, 'list'),
+    ('product-detail', ProductDetailView, 'retrieve'),
+    ('category-list', CategoryViewSet, 'list'),
+    ('clothes-list', CategoryProductsViewSet, 'list'),
+    ('cartview-detail', CartViewSet, 'retrieve'),
+    ('orderview-list', OrderViewSet, 'list'),
+    ('favorites-list', FavoritesViewSet, 'list'),
+    ('shipping-list', ShippingViewSet, 'list'),
+    ('card-detail-list', CardDetailViewSet, 'list'),
+]
+
+SEQUENTIAL_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on \w+'),
+    'sqlite': re.compile(r'\bSCAN (?!CONSTANT ROW)\w+(?!.*\bUSING\b)'),
+}
+
+
+def view_queryset(view_class, action, request):
+    view = view_class(request=request, format_kwarg=None, kwargs={}, action=action)
+    queryset = view.filter_queryset(view.get_queryset())
+    if action == 'retrieve':
+        return queryset.filter(**{view.lookup_field: 1})
+    paginator = view.paginator
+    if isinstance(paginator, CursorPagination):
+        queryset = queryset.order_by(*paginator.ordering)[:paginator.page_size]
+    return queryset
+
+
+def sequential_scans(plan, vendor=None):
+    pattern = SEQUENTIAL_SCAN_PATTERNS.get(vendor or connection.vendor)
+    if pattern is None:
+        return []
+    return [match.group(0) for line in plan.splitlines() for match in [pattern.search(line)] if match]
+
+
+class Command(BaseCommand):
+    help = ("Run EXPLAIN over the main queryset of each API view and flag sequential scans. "
+            "Plans depend on table statistics, so run it against a realistically sized database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Email of the user whose querysets are explained (default: first user).')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only flagged ones.')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.get(email=options['user'])
+        else:
+            user = User.objects.order_by('id').first() or User(id=0)
+
+        request = Request(APIRequestFactory().get('/'))
+        request.user = user
+
+        flagged = 0
+        for label, view_class, action in VIEWS:
+            plan = view_queryset(view_class, action, request).explain()
+            scans = sequential_scans(plan)
+            if scans:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f'{label}: {", ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{label}: ok'))
+            if scans or options['verbose_plans']:
+                self.stdout.write(plan)
+
+        if flagged:
+            self.stdout.write(self.style.WARNING(f'{flagged} view(s) use sequential scans'))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from shopping.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, date_range_bounds, stream_orders
+
+
+def date_arg(value):
+    parsed = parse_date(value)
+    if parsed is None:
+        raise CommandError(f'Invalid date {value!r}; use YYYY-MM-DD')
+    return parsed
+
+
+class Command(BaseCommand):
+    help = 'Stream orders with their items and shipping address for an inclusive date range as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date_arg, required=True)
+        parser.add_argument('--end', type=date_arg, required=True)
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', help='File to write; defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['start'] > options['end']:
+            raise CommandError('--start must not be after --end')
+        lines = stream_orders(options['format'], *date_range_bounds(options['start'], options['end']),
+                              chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+                stream.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
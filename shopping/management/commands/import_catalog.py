@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from shopping.catalog_import import FORMATS, CatalogImporter, detect_format, parse_rows, read_rows
+
+
+class Command(BaseCommand):
+    help = ('Stream a CSV or JSON Lines file of product variants into the catalog, upserting by SKU. '
+            'Columns: sku, product, category, current_price, stock_quantity and optionally description, '
+            'base_price, original_price, is_available, color, size, size_type.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, help='Defaults to the file extension.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--progress-every', type=int, default=50_000, help='Report progress every N rows.')
+
+    def handle(self, *args, **options):
+        importer = CatalogImporter(options['batch_size'])
+        every = max(options['progress_every'], 1)
+        reported = [0]
+
+        def progress(rows, elapsed):
+            if rows - reported[0] >= every:
+                reported[0] = rows
+                self.stdout.write(f'{rows} rows, {rows / elapsed:.0f} rows/s')
+
+        fmt = options['format'] or detect_format(options['path'])
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as stream:
+                elapsed = importer.run(parse_rows(read_rows(stream, fmt)), progress)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'{exc} (stopped after {importer.rows} rows; committed batches are kept '
+                               f'and safe to re-import)')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.rows} rows ({importer.products_created} new products) in {elapsed:.1f}s '
+            f'({importer.rows / elapsed if elapsed else 0:.0f} rows/s)'
+        ))
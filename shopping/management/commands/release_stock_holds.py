@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from shopping.inventory import release_expired_holds
+
+
+class Command(BaseCommand):
+    help = 'Delete expired stock holds so their quantity is sellable again. Schedule it, e.g. every minute from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        released = release_expired_holds(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {released} expired stock holds'))
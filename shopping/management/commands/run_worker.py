@@ -0,0 +1,46 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from shopping.taskqueue import requeue_stale, run_pending
+
+
+def work(batch_size, poll_interval, once):
+    while True:
+        close_old_connections()
+        processed = run_pending(batch_size)
+        if once and not processed:
+            return
+        if not processed:
+            time.sleep(poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Run background task workers (post-payment order processing and other queued jobs).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to sleep when idle.')
+        parser.add_argument('--once', action='store_true', help='Exit once no due tasks are left.')
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale task(s)'))
+
+        worker_args = (options['batch_size'], options['poll_interval'], options['once'])
+        if options['processes'] <= 1:
+            work(*worker_args)
+            return
+
+        # Child processes must open their own database connections.
+        connections.close_all()
+        workers = [multiprocessing.Process(target=work, args=worker_args, daemon=True)
+                   for _ in range(options['processes'])]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
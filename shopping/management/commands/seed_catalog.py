@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from shopping.benchmark import seed_catalog
+
+
+class Command(BaseCommand):
+    help = 'Seed the configured database with a synthetic catalog, users and carts for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--products', type=int, default=10_000)
+        parser.add_argument('--variants', type=int, default=4, help='Variants per product.')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--prefix', default='bench', help='Prefix for generated names, SKUs and emails.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with transaction.atomic():
+            product_ids = seed_catalog(options['categories'], options['products'], options['variants'],
+                                       options['users'], prefix=options['prefix'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(product_ids)} products with {options["variants"]} variants each and '
+            f'{options["users"]} users in {time.perf_counter() - started:.1f}s'
+        ))
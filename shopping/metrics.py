@@ -0,0 +1,62 @@
+import math
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize(values):
+    ordered = sorted(round(value, 2) for value in values)
+    return {
+        'p50': percentile(ordered, 0.50),
+        'p95': percentile(ordered, 0.95),
+        'p99': percentile(ordered, 0.99),
+        'max': ordered[-1] if ordered else None,
+    }
+
+
+class MetricsRegistry:
+    """
+    Per-endpoint request samples kept in bounded windows, so percentiles
+    reflect the most recent ``METRICS_WINDOW_SIZE`` requests per endpoint.
+    """
+
+    def __init__(self, window_size=None):
+        self.window_size = window_size
+        self._lock = threading.Lock()
+        self._counts = defaultdict(int)
+        self._samples = defaultdict(lambda: defaultdict(lambda: deque(maxlen=self._window())))
+
+    def _window(self):
+        return self.window_size or settings.METRICS_WINDOW_SIZE
+
+    def record(self, label, **values):
+        with self._lock:
+            self._counts[label] += 1
+            for name, value in values.items():
+                self._samples[label][name].append(value)
+
+    def snapshot(self):
+        with self._lock:
+            samples = {label: {name: list(values) for name, values in metrics.items()}
+                       for label, metrics in self._samples.items()}
+            counts = dict(self._counts)
+        return {
+            label: {'count': counts[label], **{name: summarize(values) for name, values in metrics.items()}}
+            for label, metrics in sorted(samples.items())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+            self._samples.clear()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,115 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class RequestStats:
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.query_count += 1
+
+
+class RequestMetricsMiddleware:
+    """
+    Records query count, DB time, render time, app time and response size
+    per resolved view name (e.g. ``cartview-add-item``), so DRF actions are
+    tracked separately. Render time is ``Response.render()``, i.e. the
+    renderer turning serialized data into bytes; app time is everything
+    outside the database, rendering included. Works in both WSGI and ASGI
+    stacks.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = request._request_stats = RequestStats()
+        started = time.perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats = request._request_stats = RequestStats()
+        started = time.perf_counter()
+        # The async ORM runs queries via sync_to_async on the request's
+        # thread-sensitive worker thread, whose connection is not the one
+        # seen here, so the wrapper is installed over there.
+        await sync_to_async(lambda: connection.execute_wrappers.append(stats))()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(lambda: connection.execute_wrappers.remove(stats))()
+        return self.finish(request, response, stats, started)
+
+    def process_template_response(self, request, response):
+        # Called right before the handler renders a DRF Response.
+        stats = getattr(request, '_request_stats', None)
+        if stats is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                stats.render_time += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, stats, started):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+
+        label = match.view_name
+        db_ms = stats.db_time * 1000
+        render_ms = stats.render_time * 1000
+        app_ms = max((time.perf_counter() - started) * 1000 - db_ms, 0.0)
+        size = 0 if response.streaming else len(response.content)
+
+        registry.record(label, queries=stats.query_count, db_ms=db_ms, render_ms=render_ms, app_ms=app_ms,
+                        response_bytes=size)
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(stats.query_count)
+            response['X-DB-Time-Ms'] = f'{db_ms:.2f}'
+            response['X-Render-Time-Ms'] = f'{render_ms:.2f}'
+            response['X-App-Time-Ms'] = f'{app_ms:.2f}'
+            response['X-Response-Size'] = str(size)
+
+        self.check_budget(label, stats.query_count)
+        return response
+
+    def check_budget(self, label, query_count):
+        budget = settings.QUERY_BUDGETS.get(label)
+        if budget is None or query_count <= budget:
+            return
+        message = f'{label} ran {query_count} queries, budget is {budget}'
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:06
+
+from django.db import migrations, models
+
+
+def backfill_search_documents(apps, schema_editor):
+    Product = apps.get_model('shopping', 'Product')
+    ProductItem = apps.get_model('shopping', 'ProductItem')
+
+    parts = {
+        product_id: [name, description, category]
+        for product_id, name, description, category in Product.objects.values_list(
+            'id', 'name', 'description', 'category__name'
+        )
+    }
+    for product_id, sku, color in ProductItem.objects.values_list('product_id', 'sku', 'color__name'):
+        parts[product_id] += [sku, color]
+    Product.objects.bulk_update(
+        [Product(id=product_id, search_document=' '.join(part for part in document if part))
+         for product_id, document in parts.items()],
+        ['search_document'],
+        batch_size=1000,
+    )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS product_search_document_gin ON shopping_product "
+            "USING GIN (to_tsvector('simple'::regconfig, search_document))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS product_search_document_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0013_cartitem_unique_cart_product'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:07
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.db.models import Max, Min, Sum
+
+
+def backfill_listings(apps, schema_editor):
+    Product = apps.get_model('shopping', 'Product')
+    ProductItem = apps.get_model('shopping', 'ProductItem')
+    ProductListing = apps.get_model('shopping', 'ProductListing')
+
+    available = ProductItem.objects.filter(is_available=True)
+    prices = {
+        row['product_id']: row
+        for row in available.values('product_id').annotate(
+            min_price=Min('current_price'), max_price=Max('current_price'), total_stock=Sum('stock_quantity')
+        )
+    }
+    colors, sizes = defaultdict(set), defaultdict(set)
+    for product_id, color, size in available.filter(stock_quantity__gt=0) \
+            .values_list('product_id', 'color__name', 'size__name').distinct():
+        if color:
+            colors[product_id].add(color)
+        if size:
+            sizes[product_id].add(size)
+
+    listings = []
+    for product_id in Product.objects.values_list('id', flat=True):
+        row = prices.get(product_id, {})
+        total_stock = row.get('total_stock') or 0
+        listings.append(ProductListing(
+            product_id=product_id, min_price=row.get('min_price'), max_price=row.get('max_price'),
+            total_stock=total_stock, in_stock=total_stock > 0,
+            colors=sorted(colors[product_id]), sizes=sorted(sizes[product_id]),
+        ))
+    ProductListing.objects.bulk_create(listings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0014_product_search_document'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductListing',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='listing', serialize=False, to='shopping.product')),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('total_stock', models.PositiveIntegerField(default=0)),
+                ('in_stock', models.BooleanField(default=False)),
+                ('colors', models.JSONField(blank=True, default=list)),
+                ('sizes', models.JSONField(blank=True, default=list)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_listings, migrations.RunPython.noop),
+    ]
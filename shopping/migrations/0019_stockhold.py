@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:16
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def holds_from_cart_lines(apps, schema_editor):
+    # Stock used to be decremented on add-to-cart. Put it back and hold it
+    # for the cart instead, so carts in flight keep what they reserved.
+    CartItem = apps.get_model('shopping', 'CartItem')
+    ProductItem = apps.get_model('shopping', 'ProductItem')
+    ProductListing = apps.get_model('shopping', 'ProductListing')
+    StockHold = apps.get_model('shopping', 'StockHold')
+
+    expires_at = timezone.now() + settings.STOCK_HOLD_TTL
+    returned, holds = defaultdict(int), []
+    for cart_id, product_item_id, product_id, quantity in CartItem.objects.filter(prod_quant__gt=0) \
+            .values_list('cart_id', 'product_id', 'product__product_id', 'prod_quant').iterator():
+        returned[product_item_id, product_id] += quantity
+        holds.append(StockHold(cart_id=cart_id, product_item_id=product_item_id, quantity=quantity,
+                               expires_at=expires_at))
+
+    per_product = defaultdict(int)
+    for (product_item_id, product_id), quantity in returned.items():
+        ProductItem.objects.filter(id=product_item_id).update(stock_quantity=F('stock_quantity') + quantity)
+        per_product[product_id] += quantity
+    for product_id, quantity in per_product.items():
+        ProductListing.objects.filter(product_id=product_id).update(
+            total_stock=F('total_stock') + quantity, in_stock=True
+        )
+    StockHold.objects.bulk_create(holds, batch_size=1000)
+
+
+def cart_lines_from_holds(apps, schema_editor):
+    ProductItem = apps.get_model('shopping', 'ProductItem')
+    StockHold = apps.get_model('shopping', 'StockHold')
+
+    for product_item_id, quantity in StockHold.objects.values_list('product_item_id', 'quantity').iterator():
+        ProductItem.objects.filter(id=product_item_id).update(stock_quantity=F('stock_quantity') - quantity)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0018_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('cart', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='shopping.cart')),
+                ('product_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='shopping.productitem')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product_item', 'expires_at'], name='hold_item_expiry_idx'), models.Index(fields=['expires_at'], name='hold_expiry_idx')],
+                'constraints': [models.UniqueConstraint(fields=('cart', 'product_item'), name='unique_cart_hold')],
+            },
+        ),
+        migrations.RunPython(holds_from_cart_lines, cart_lines_from_holds),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0020_order_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
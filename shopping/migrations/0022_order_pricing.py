@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:29
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_subtotal(apps, schema_editor):
+    # Orders so far were never discounted.
+    Order = apps.get_model('shopping', 'Order')
+    Order.objects.update(subtotal=F('total_price') - F('shipping_cost'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0021_productitem_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='discount_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(backfill_subtotal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shopping', '0022_order_pricing'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['color', 'product'], name='variant_color_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['size', 'product'], name='variant_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productitem',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['product', 'current_price'], name='variant_price_idx'),
+        ),
+    ]
@@ -1,4 +1,10 @@
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
 from django.db import models
+from django.db.models import F, Max, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from accounts.models import User
 
@@ -49,10 +55,24 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     category = models.ForeignKey('ProductCategory', on_delete=models.PROTECT)
+    # Denormalized name/description/category/SKU/color text; see shopping.search.
+    search_document = models.TextField(blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='product_recent_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], condition=models.Q(is_active=True),
+                         name='product_active_category_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def has_stock(self):
+        # Iterates the (usually prefetched) variants instead of issuing a query.
+        return any(variant.is_available and variant.stock_quantity > 0 for variant in self.variants.all())
+
 
 class ProductItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variants')
@@ -62,13 +82,40 @@ class ProductItem(models.Model):
     stock_quantity = models.PositiveIntegerField()
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped explicitly by queryset.update() callers that change stock or price.
+    updated_at = models.DateTimeField(auto_now=True)
     color = models.ForeignKey('Color', on_delete=models.PROTECT, null=True, blank=True)
     size = models.ForeignKey('Size', on_delete=models.PROTECT, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product'], condition=models.Q(is_available=True), name='variant_available_idx'),
+            # Facet filters and counts (shopping.facets) only look at available variants.
+            models.Index(fields=['color', 'product'], condition=models.Q(is_available=True), name='variant_color_idx'),
+            models.Index(fields=['size', 'product'], condition=models.Q(is_available=True), name='variant_size_idx'),
+            models.Index(fields=['product', 'current_price'], condition=models.Q(is_available=True),
+                         name='variant_price_idx'),
+        ]
+
     def __str__(self):
         return f"{self.product.name} - {self.sku}"
 
 
+class ProductListing(models.Model):
+    # Per-product listing projection, maintained by shopping.listing.
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='listing')
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    total_stock = models.PositiveIntegerField(default=0)
+    in_stock = models.BooleanField(default=False)
+    colors = models.JSONField(default=list, blank=True)
+    sizes = models.JSONField(default=list, blank=True)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Listing for {self.product_id}"
+
+
 class PromoCode(models.Model):
     code = models.CharField(max_length=20, unique=True)
     discount_present = models.DecimalField(max_digits=5, decimal_places=2)
@@ -94,6 +141,9 @@ class ShippingAddress(models.Model):
     class Meta:
         verbose_name_plural = 'Shipping Addresses'
         ordering = ['-is_default']
+        indexes = [
+            models.Index(fields=['user', '-is_default'], name='address_user_default_idx'),
+        ]
 
     def __str__(self):
         return f"{self.recipient_name}, {self.city}"
@@ -105,17 +155,62 @@ class Cart(models.Model):
     shipping = models.ForeignKey(ShippingAddress, on_delete=models.PROTECT)
     promo_code = models.ForeignKey(PromoCode, on_delete=models.CASCADE, blank=True, null=True)
 
+    def _totals_aggregates(self):
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        return {
+            'subtotal': Coalesce(Sum(F('items__prod_quant') * F('items__product__current_price'), output_field=money),
+                                 Value(Decimal('0.00')), output_field=money),
+            'shipping_cost': Max('shipping__shipping_cost'),
+        }
+
+    def _store_totals(self, totals, promo):
+        from .pricing import discount_for
+
+        totals['discount'] = discount_for(totals['subtotal'], promo)
+        totals['bagtotal'] = totals['subtotal'] - totals['discount'] + totals['shipping_cost']
+        self._totals = totals
+        return totals
+
+    def get_totals(self):
+        # One aggregate query for subtotal and shipping; memoized on the
+        # instance until invalidate_totals() is called after item changes.
+        # The promo comes from the in-memory table of valid codes.
+        from .pricing import active_promo
+
+        totals = getattr(self, '_totals', None)
+        if totals is None:
+            totals = self._store_totals(Cart.objects.filter(pk=self.pk).aggregate(**self._totals_aggregates()),
+                                        active_promo(self.promo_code_id))
+        return totals
+
+    async def aget_totals(self):
+        from .pricing import active_promo
+
+        totals = getattr(self, '_totals', None)
+        if totals is None:
+            promo = await sync_to_async(active_promo)(self.promo_code_id) if self.promo_code_id else None
+            totals = self._store_totals(await Cart.objects.filter(pk=self.pk).aaggregate(**self._totals_aggregates()),
+                                        promo)
+        return totals
+
+    def invalidate_totals(self):
+        self._totals = None
+
     @property
     def subtotal(self):
-        return sum(item.subtotal for item in self.items.all())
+        return self.get_totals()['subtotal']
 
     @property
     def bagtotal(self):
-        return self.subtotal + self.shipping.shipping_cost
+        return self.get_totals()['bagtotal']
 
     @property
     def shipping_cost(self):
-        return self.shipping.shipping_cost
+        return self.get_totals()['shipping_cost']
+
+    @property
+    def discount(self):
+        return self.get_totals()['discount']
 
 
 class CartItem(models.Model):
@@ -123,11 +218,37 @@ class CartItem(models.Model):
     product = models.ForeignKey(ProductItem, on_delete=models.CASCADE)
     prod_quant = models.PositiveIntegerField(default=1)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='unique_cart_product'),
+        ]
+
     @property
     def subtotal(self):
         return self.prod_quant * self.product.current_price
 
 
+class StockHold(models.Model):
+    # A cart's claim on stock; expires unless the cart is checked out.
+    product_item = models.ForeignKey(ProductItem, on_delete=models.CASCADE, related_name='holds')
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='holds')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product_item'], name='unique_cart_hold'),
+        ]
+        indexes = [
+            models.Index(fields=['product_item', 'expires_at'], name='hold_item_expiry_idx'),
+            models.Index(fields=['expires_at'], name='hold_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} × {self.product_item_id} until {self.expires_at}"
+
+
 class Payment(models.Model):
     STATUS = [
         ('PENDING', 'pending'),
@@ -171,8 +292,17 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     shipping_cost = models.DecimalField(max_digits=10, decimal_places=2, default=1)
     status = models.CharField(max_length=1, choices=STATUS_CHOICES, default='P', blank=True, null=True)
+    # Priced once at checkout (shopping.pricing); reads never recompute them.
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    discount_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
     total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='order_user_recent_idx'),
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.id}"
 
@@ -200,11 +330,59 @@ class Favorite(models.Model):
     class Meta:
         unique_together = ('user', 'product')
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='favorite_user_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user}'s favorite: {self.product}"
 
 
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    scope = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'scope', 'key'], name='unique_idempotency_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key}"
+
+
+class Task(models.Model):
+    STATUS = [
+        ('PENDING', 'pending'),
+        ('RUNNING', 'running'),
+        ('FAILED', 'failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['run_at'], condition=models.Q(status='PENDING'), name='task_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+
 class PaymentCard(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     last_four = models.CharField(max_length=4)
@@ -0,0 +1,39 @@
+import base64
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from rest_framework.pagination import CursorPagination
+
+
+class ProductCursorPagination(CursorPagination):
+    # Keyset pagination: the cursor carries the last seen (created_at, id),
+    # so every page is an index range scan regardless of depth.
+    ordering = ('-created_at', '-id')
+    page_size = settings.PRODUCT_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.PRODUCT_MAX_PAGE_SIZE
+
+
+def encode_keyset(created_at, pk):
+    return base64.urlsafe_b64encode(f'{created_at.isoformat()}|{pk}'.encode()).decode()
+
+
+def decode_keyset(cursor):
+    """Inverse of encode_keyset(); raises ValueError for malformed cursors."""
+    try:
+        created_at, _, pk = base64.urlsafe_b64decode(cursor.encode()).decode().partition('|')
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if created_at is None:
+        raise ValueError('Invalid cursor')
+    return created_at, pk
+
+
+def get_page_size(value):
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return settings.PRODUCT_PAGE_SIZE
+    return min(max(page_size, 1), settings.PRODUCT_MAX_PAGE_SIZE)
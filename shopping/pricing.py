@@ -0,0 +1,69 @@
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from .cache import get_version
+
+CENTS = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+Promo = namedtuple('Promo', 'id code percent valid_from valid_until')
+Pricing = namedtuple('Pricing', 'subtotal discount promo')
+
+_valid_promos = (None, {}, {})
+
+
+def _bucket(now):
+    size = settings.PROMO_CACHE_BUCKET_SECONDS
+    start = datetime.fromtimestamp(int(now.timestamp()) // size * size, tz=dt_timezone.utc)
+    return start, start + timedelta(seconds=size)
+
+
+def _valid_codes(now):
+    """
+    Codes valid at some point in the current time bucket, as ``(by_id, by_code)``.
+    Reloaded once per bucket, or sooner when a PromoCode is saved.
+    """
+    global _valid_promos
+    from .models import PromoCode
+
+    start, end = _bucket(now)
+    key = (get_version('promos'), start)
+    if _valid_promos[0] != key:
+        promos = [
+            Promo(pk, code, min(percent, Decimal('100')), valid_from, valid_until)
+            for pk, code, percent, valid_from, valid_until in PromoCode.objects.filter(
+                is_active=True, valid_from__lt=end, valid_until__gte=start,
+            ).values_list('id', 'code', 'discount_present', 'valid_from', 'valid_until')
+        ]
+        _valid_promos = (key, {promo.id: promo for promo in promos}, {promo.code: promo for promo in promos})
+    return _valid_promos[1], _valid_promos[2]
+
+
+def active_promo(promo_id=None, code=None, now=None):
+    """The promo with ``promo_id`` or ``code`` if it is valid right now, else None."""
+    if promo_id is None and not code:
+        return None
+    now = now or timezone.now()
+    by_id, by_code = _valid_codes(now)
+    promo = by_id.get(promo_id) if promo_id is not None else by_code.get(code)
+    if promo is None or not promo.valid_from <= now <= promo.valid_until:
+        return None
+    return promo
+
+
+def discount_for(subtotal, promo):
+    if promo is None:
+        return ZERO
+    return min((subtotal * promo.percent / 100).quantize(CENTS, rounding=ROUND_HALF_UP), subtotal)
+
+
+def price_lines(lines, promo=None):
+    """Price ``(quantity, unit_price)`` lines in one pass and apply ``promo`` to the subtotal."""
+    subtotal = ZERO
+    for quantity, unit_price in lines:
+        subtotal += quantity * unit_price
+    return Pricing(subtotal, discount_for(subtotal, promo), promo)
@@ -0,0 +1,152 @@
+import bisect
+import re
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import BooleanField, Case, F, FloatField, Func, Value, When
+from rest_framework import filters
+
+from .cache import get_version, invalidate_on_commit
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+REFRESH_CHUNK_SIZE = 1000
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+class TsVector(Func):
+    function = 'to_tsvector'
+    template = "%(function)s('simple'::regconfig, %(expressions)s)"
+
+
+class TsQuery(Func):
+    function = 'to_tsquery'
+    template = "%(function)s('simple'::regconfig, %(expressions)s)"
+
+
+class TsMatch(Func):
+    arg_joiner = ' @@ '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+class TsRank(Func):
+    function = 'ts_rank'
+    output_field = FloatField()
+
+
+class InvertedIndex:
+    """
+    In-process stand-in for the PostgreSQL GIN index, used when the database
+    has no full-text search (SQLite test runs). Prefix lookups bisect a
+    sorted token list, so autocomplete does not scan every posting.
+    """
+
+    def __init__(self, documents):
+        self.postings = defaultdict(dict)
+        for product_id, document in documents:
+            for token in tokenize(document):
+                self.postings[token][product_id] = self.postings[token].get(product_id, 0) + 1
+        self.tokens = sorted(self.postings)
+
+    def _prefix_matches(self, prefix):
+        scores = defaultdict(int)
+        start = bisect.bisect_left(self.tokens, prefix)
+        for token in self.tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            for product_id, count in self.postings[token].items():
+                scores[product_id] += count
+        return scores
+
+    def search(self, words):
+        scores = None
+        for word in words:
+            matches = self._prefix_matches(word)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {product_id: scores[product_id] + count
+                          for product_id, count in matches.items() if product_id in scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+
+_python_index = (None, None)
+
+
+def get_python_index():
+    global _python_index
+    from .models import Product
+
+    version = get_version('search')
+    if _python_index[0] != version:
+        _python_index = (version, InvertedIndex(Product.objects.values_list('id', 'search_document').iterator()))
+    return _python_index[1]
+
+
+def search_products(queryset, term):
+    """Filter ``queryset`` to products matching every word of ``term`` as a prefix, annotated with ``search_rank``."""
+    words = tokenize(term)
+    if not words:
+        return queryset.none()
+
+    if connection.vendor == 'postgresql':
+        vector = TsVector(F('search_document'))
+        query = TsQuery(Value(' & '.join(f'{word}:*' for word in words)))
+        return queryset.filter(TsMatch(vector, query)).annotate(search_rank=TsRank(vector, query))
+
+    scores = get_python_index().search(words)
+    return queryset.filter(id__in=scores).annotate(search_rank=Case(
+        *[When(id=product_id, then=Value(float(score))) for product_id, score in scores.items()],
+        default=Value(0.0), output_field=FloatField(),
+    ))
+
+
+def build_search_document(parts):
+    return ' '.join(part for part in parts if part)
+
+
+def refresh_search_documents(product_ids):
+    from .models import Product, ProductItem
+
+    product_ids = list(set(product_ids))
+    for start in range(0, len(product_ids), REFRESH_CHUNK_SIZE):
+        chunk = product_ids[start:start + REFRESH_CHUNK_SIZE]
+        parts = {
+            product_id: [name, description, category]
+            for product_id, name, description, category in Product.objects.filter(id__in=chunk)
+            .values_list('id', 'name', 'description', 'category__name')
+        }
+        for product_id, sku, color in ProductItem.objects.filter(product_id__in=chunk) \
+                .values_list('product_id', 'sku', 'color__name'):
+            parts[product_id] += [sku, color]
+        Product.objects.bulk_update(
+            [Product(id=product_id, search_document=build_search_document(document))
+             for product_id, document in parts.items()],
+            ['search_document'],
+        )
+    if product_ids:
+        invalidate_on_commit('search')
+
+
+class ProductSearchFilter(filters.BaseFilterBackend):
+    search_param = 'search'
+
+    def get_search_term(self, request):
+        return request.query_params.get(self.search_param, '')
+
+    def filter_queryset(self, request, queryset, view):
+        term = self.get_search_term(request)
+        if not tokenize(term):
+            return queryset
+        return search_products(queryset, term)
+
+    def get_ordering(self, request, queryset, view):
+        # Picked up by CursorPagination: rank searches by relevance.
+        if tokenize(self.get_search_term(request)):
+            return ('-search_rank', '-id')
+        return view.paginator.ordering
@@ -11,22 +11,36 @@ class ProductCategorySerializer(serializers.ModelSerializer):
 
 
 class ProductListSerializer(serializers.ModelSerializer):
-    category = ProductCategory()
+    min_price = serializers.DecimalField(source='listing.min_price', max_digits=10, decimal_places=2, read_only=True)
+    max_price = serializers.DecimalField(source='listing.max_price', max_digits=10, decimal_places=2, read_only=True)
+    in_stock = serializers.BooleanField(source='listing.in_stock', read_only=True, default=False)
+    colors = serializers.ListField(source='listing.colors', read_only=True, default=list)
+    sizes = serializers.ListField(source='listing.sizes', read_only=True, default=list)
+    is_favorite = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
-        fields = ('id', 'category', 'name', 'description', 'base_price')
+        fields = ('id', 'category', 'name', 'description', 'base_price', 'min_price', 'max_price', 'in_stock',
+                  'colors', 'sizes', 'is_favorite')
+
+    def get_is_favorite(self, obj):
+        return obj.id in self.context.get('favorite_ids', ())
 
 
 class ProductVariantSerializer(serializers.ModelSerializer):
     color = serializers.StringRelatedField()
     size = serializers.StringRelatedField()
     product = serializers.StringRelatedField()
+    available_quantity = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductItem
         fields = (
-        'id', 'product', 'sku', 'current_price', 'original_price', 'color', 'size', 'stock_quantity', 'is_available')
+        'id', 'product', 'sku', 'current_price', 'original_price', 'color', 'size', 'stock_quantity',
+        'available_quantity', 'is_available')
+
+    def get_available_quantity(self, obj):
+        return self.context.get('availability', {}).get(obj.id, obj.stock_quantity)
 
 
 class ProductDetailSerializer(ProductListSerializer):
@@ -66,15 +80,16 @@ class CartItemSerializer(serializers.ModelSerializer):
 class CartSerializer(serializers.ModelSerializer):
     items = CartItemSerializer(many=True)
     subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    discount = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     bagtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
     shipping_cost = serializers.SerializerMethodField()
 
     class Meta:
         model = Cart
-        fields = ('id', 'user', 'items', 'subtotal', 'shipping_cost', 'bagtotal')
+        fields = ('id', 'user', 'items', 'subtotal', 'discount', 'shipping_cost', 'bagtotal')
 
     def get_shipping_cost(self, obj):
-        return obj.shipping.shipping_cost
+        return obj.shipping_cost
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
@@ -96,16 +111,9 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = [
-            'id', 'shipping', 'items', 'promo_code', 'total_price',
-
+            'id', 'shipping', 'items', 'promo_code', 'subtotal', 'discount_amount', 'shipping_cost', 'total_price',
         ]
 
-    def get_subtotal(self, obj):
-        return obj.subtotal
-
-    def get_discount_amount(self, obj):
-        return obj.discount_amount
-
 
 class AddItemSerializer(serializers.Serializer):
     product_id = serializers.IntegerField(min_value=1)
@@ -117,6 +125,10 @@ class AddItemSerializer(serializers.Serializer):
         return value
 
 
+class ApplyPromoSerializer(serializers.Serializer):
+    code = serializers.CharField(max_length=20)
+
+
 class ReduceItemSerializer(serializers.Serializer):
     product_id = serializers.IntegerField()
     quantity = serializers.IntegerField()
@@ -136,10 +148,13 @@ class ReduceItemSerializer(serializers.Serializer):
 
 class FavouriteSerializer(serializers.ModelSerializer):
     product = ProductListSerializer(read_only=True)
+    product_id = serializers.PrimaryKeyRelatedField(
+        source='product', queryset=Product.objects.filter(is_active=True), write_only=True
+    )
 
     class Meta:
         model = Favorite
-        fields = ('id', 'product', 'created_at')
+        fields = ('id', 'product', 'product_id', 'created_at')
 
 
 class UserInfoSerializer(serializers.ModelSerializer):
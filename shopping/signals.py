@@ -1,14 +1,104 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import Payment
+from .cache import invalidate_on_commit
+from .listing import refresh_listings
+from .models import Color, Favorite, Order, OrderItem, Payment, Product, ProductCategory, ProductItem, PromoCode, \
+    ShippingAddress, Size
+from .search import refresh_search_documents
+from .taskqueue import enqueue
 
 
 @receiver(post_save, sender=Payment)
 def update_order_status_on_payment(sender, instance, created, **kwargs):
+    if instance.status == 'COMPLETED':
+        enqueue('orders.payment_received', order_id=instance.order_id, payment_id=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Order)
+@receiver([post_save, post_delete], sender=ShippingAddress)
+def invalidate_user_orders(sender, instance, **kwargs):
+    invalidate_on_commit('orders', scope=instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def invalidate_order_item_owner(sender, instance, **kwargs):
+    invalidate_order_owner(instance.order_id)
+
+
+@receiver(post_save, sender=Payment)
+def invalidate_paid_order_owner(sender, instance, **kwargs):
+    invalidate_order_owner(instance.order_id)
+
+
+def invalidate_order_owner(order_id):
+    user_id = Order.objects.filter(id=order_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_on_commit('orders', scope=user_id)
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+def invalidate_favorites(sender, instance, **kwargs):
+    invalidate_on_commit('favorites', scope=instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=PromoCode)
+def invalidate_promos(sender, **kwargs):
+    invalidate_on_commit('promos')
+
+
+@receiver([post_save, post_delete], sender=ProductCategory)
+def invalidate_categories(sender, **kwargs):
+    invalidate_on_commit('categories')
+
+
+@receiver(post_save, sender=ProductCategory)
+def reindex_category_products(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_documents(Product.objects.filter(category=instance).values_list('id', flat=True))
+        invalidate_on_commit('catalog')
+
+
+@receiver([post_save, post_delete], sender=Color)
+def invalidate_colors(sender, **kwargs):
+    invalidate_on_commit('colors')
+
+
+@receiver(post_save, sender=Color)
+def reindex_color_products(sender, instance, created, **kwargs):
+    if not created:
+        product_ids = list(ProductItem.objects.filter(color=instance).values_list('product_id', flat=True).distinct())
+        refresh_search_documents(product_ids)
+        refresh_listings(product_ids)
+
+
+@receiver([post_save, post_delete], sender=Size)
+def invalidate_sizes(sender, **kwargs):
+    invalidate_on_commit('sizes')
+
+
+@receiver(post_save, sender=Size)
+def relist_size_products(sender, instance, created, **kwargs):
+    if not created:
+        refresh_listings(ProductItem.objects.filter(size=instance).values_list('product_id', flat=True).distinct())
+
+
+@receiver(post_save, sender=Product)
+def reindex_product(sender, instance, created, **kwargs):
+    refresh_search_documents([instance.pk])
+    invalidate_on_commit('facets')
+    invalidate_on_commit('catalog')
     if created:
-        order = instance.order
-        order.status = 'P'
-        order.save()
+        refresh_listings([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def invalidate_deleted_product(sender, **kwargs):
+    invalidate_on_commit('catalog')
 
 
+@receiver([post_save, post_delete], sender=ProductItem)
+def reindex_variant_product(sender, instance, **kwargs):
+    refresh_search_documents([instance.product_id])
+    refresh_listings([instance.product_id])
+    invalidate_on_commit('facets')
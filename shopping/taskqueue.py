@@ -0,0 +1,97 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name, max_attempts=5):
+    """Register a function as a background task runnable by ``run_worker``."""
+
+    def decorator(func):
+        _registry[name] = (func, max_attempts)
+        return func
+
+    return decorator
+
+
+def enqueue(name, run_at=None, **payload):
+    """
+    Store a task row. Call it inside the transaction that produced the work
+    so the task commits (or rolls back) together with it.
+    """
+    _, max_attempts = _registry[name]
+    return Task.objects.create(name=name, payload=payload, max_attempts=max_attempts,
+                               run_at=run_at or timezone.now())
+
+
+def claim_tasks(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = Task.objects.filter(status='PENDING', run_at__lte=now).order_by('run_at')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        tasks = list(queryset[:batch_size])
+        Task.objects.filter(id__in=[t.id for t in tasks]).update(
+            status='RUNNING', locked_at=now, attempts=F('attempts') + 1
+        )
+    return tasks
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=min(settings.TASK_RETRY_BASE_DELAY * 2 ** (attempts - 1), settings.TASK_RETRY_MAX_DELAY))
+
+
+def run_task(task_row):
+    attempts = task_row.attempts + 1
+    try:
+        func, _ = _registry[task_row.name]
+        with transaction.atomic():
+            func(**task_row.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning('Task %s #%s failed (attempt %s/%s)', task_row.name, task_row.id, attempts,
+                       task_row.max_attempts)
+        if attempts >= task_row.max_attempts:
+            Task.objects.filter(id=task_row.id).update(status='FAILED', last_error=error)
+        else:
+            Task.objects.filter(id=task_row.id).update(
+                status='PENDING', last_error=error, run_at=timezone.now() + retry_delay(attempts)
+            )
+        return False
+    Task.objects.filter(id=task_row.id).delete()
+    return True
+
+
+def run_pending(batch_size=50):
+    """Run one batch of due tasks; returns how many were claimed."""
+    tasks = claim_tasks(batch_size)
+    for task_row in tasks:
+        run_task(task_row)
+    return len(tasks)
+
+
+def requeue_stale(timeout=None):
+    """Put tasks back in the queue whose worker died while running them."""
+    cutoff = timezone.now() - (timeout or settings.TASK_STALE_AFTER)
+    return Task.objects.filter(status='RUNNING', locked_at__lt=cutoff).update(status='PENDING', locked_at=None)
+
+
+def backlog():
+    counts = dict(Task.objects.values_list('status').annotate(n=Count('id')))
+    oldest = Task.objects.filter(status='PENDING').aggregate(oldest=Min('run_at'))['oldest']
+    return {
+        'pending': counts.get('PENDING', 0),
+        'running': counts.get('RUNNING', 0),
+        'failed': counts.get('FAILED', 0),
+        'oldest_pending_age_s': max((timezone.now() - oldest).total_seconds(), 0) if oldest else 0,
+    }
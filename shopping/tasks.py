@@ -0,0 +1,34 @@
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .models import Order, Payment
+from .signals import invalidate_order_owner
+from .taskqueue import enqueue, task
+
+logger = logging.getLogger(__name__)
+
+
+@task('orders.payment_received')
+def payment_received(order_id, payment_id):
+    # Only a completed payment accepts the order; checkout already moved the
+    # stock and refreshed the listings, so nothing is left to reconcile here.
+    if not Payment.objects.filter(id=payment_id, order_id=order_id, status='COMPLETED').exists():
+        return
+    accepted = Order.objects.filter(id=order_id, status='P').update(status='A')
+    if accepted:
+        invalidate_order_owner(order_id)
+        enqueue('orders.notify_customer', order_id=order_id)
+
+
+@task('orders.notify_customer', max_attempts=3)
+def notify_customer(order_id):
+    order = Order.objects.select_related('user').get(id=order_id)
+    send_mail(
+        subject=f'{order} accepted',
+        message=f'We received your payment for {order}. Total: {order.total_price}.',
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[order.user.email],
+    )
+    logger.info('Sent payment confirmation for %s', order)
@@ -1,3 +1,833 @@
-from django.test import TestCase
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .cache import cache_stats, get_version
+from .catalog_import import CatalogImporter, parse_rows, read_rows
+from .inventory import available_to_sell, release_expired_holds
+from .management.commands.explain_views import VIEWS as EXPLAINED_VIEWS, sequential_scans
+from .metrics import registry
+from .middleware import QueryBudgetExceeded
+from .renderers import FastJSONParser, FastJSONRenderer
+from .taskqueue import backlog, run_pending
+from .models import Cart, CartItem, Color, IdempotencyKey, Order, Product, ProductCategory, ProductItem, \
+    ProductListing, PromoCode, ShippingAddress, Size, StockHold
+
+
+def clear_caches():
+    for alias_cache in caches.all():
+        alias_cache.clear()
+
+
+class CartTestMixin:
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer@example.com', 'Buyer', 'One', password='pass')
+        cls.address = ShippingAddress.objects.create(
+            user=cls.user, recipient_name='Buyer', street='1 Main St', city='Tashkent', state='TK',
+            postal_code='100000', country='UZ', phone_number='+998000000000', shipping_cost=Decimal('5.00'),
+        )
+        cls.category = ProductCategory.objects.create(name='Shirts', quantity=0)
+        cls.product = Product.objects.create(
+            name='Tee', description='', base_price=Decimal('10.00'), category=cls.category
+        )
+        cls.variant = ProductItem.objects.create(
+            product=cls.product, sku='TEE-M', current_price=Decimal('10.00'),
+            original_price=Decimal('12.00'), stock_quantity=5,
+        )
+
+    def setUp(self):
+        self.cart = Cart.objects.create(user=self.user, shipping=self.address)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def other_cart(self):
+        shopper = User.objects.create_user('shopper@example.com', 'Shopper', 'Two', password='pass')
+        return Cart.objects.create(user=shopper, shipping=self.address)
+
+    def add_item(self, quantity, variant=None):
+        return self.client.post(
+            f'/api/cartview/{self.cart.id}/add-item/',
+            {'product_id': (variant or self.variant).id, 'quantity': quantity}, format='json',
+        )
+
+
+class AddItemTests(CartTestMixin, TestCase):
+    def test_add_item_holds_stock_and_accumulates_quantity(self):
+        self.add_item(2)
+        response = self.add_item(1)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual(data['quantity'], 3)
+        self.assertEqual(Decimal(data['cart_total']), Decimal('35.00'))
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock_quantity, 5)
+        self.assertEqual(CartItem.objects.filter(cart=self.cart).count(), 1)
+        self.assertEqual(StockHold.objects.get(cart=self.cart, product_item=self.variant).quantity, 3)
+        self.assertEqual(available_to_sell([self.variant.id]), {self.variant.id: 2})
+        self.assertIsNotNone(caches['availability'].get(f'ats:{self.variant.id}'))
+        self.assertIsNone(caches['default'].get(f'ats:{self.variant.id}'))
+
+    def test_other_carts_holds_limit_add_item_until_they_expire(self):
+        other_cart = self.other_cart()
+        hold = StockHold.objects.create(cart=other_cart, product_item=self.variant, quantity=4,
+                                        expires_at=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual(self.add_item(2).json(), {'stock': 'Only 1 available'})
+
+        StockHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(release_expired_holds(), 1)
+        self.assertEqual(self.add_item(2).status_code, 200)
+
+    def test_add_item_rejects_quantity_above_stock(self):
+        response = self.add_item(6)
+
+        self.assertEqual(response.status_code, 400)
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock_quantity, 5)
+        self.assertFalse(CartItem.objects.filter(cart=self.cart).exists())
+
+
+class ProductDetailQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = ProductCategory.objects.create(name='Shoes', quantity=0)
+        cls.colors = [Color.objects.create(name=f'Color {i}') for i in range(4)]
+        cls.sizes = [Size.objects.create(name=str(i)) for i in range(4)]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def make_product(self, variant_count):
+        product = Product.objects.create(
+            name=f'Runner {variant_count}', description='', base_price=Decimal('50.00'), category=self.category
+        )
+        ProductItem.objects.bulk_create([
+            ProductItem(
+                product=product, sku=f'RUN-{variant_count}-{i}', current_price=Decimal('45.00'),
+                original_price=Decimal('50.00'), stock_quantity=3,
+                color=self.colors[i % len(self.colors)], size=self.sizes[i % len(self.sizes)],
+            )
+            for i in range(variant_count)
+        ])
+        return product
+
+    def count_queries(self, product):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries), response.json()
+
+    def test_query_count_is_independent_of_variant_count(self):
+        small, small_body = self.count_queries(self.make_product(2))
+        large, large_body = self.count_queries(self.make_product(60))
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 4)
+        self.assertEqual(len(large_body['variants']), 60)
+        self.assertEqual(large_body['variants'][0]['product'], 'Runner 60')
+        self.assertTrue(large_body['in_stock'])
+
+
+class CartTotalsTests(CartTestMixin, TestCase):
+    def test_cart_view_reports_aggregated_totals(self):
+        CartItem.objects.create(cart=self.cart, product=self.variant, prod_quant=3)
+
+        response = self.client.get(f'/api/cartview/{self.cart.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(Decimal(body['subtotal']), Decimal('30.00'))
+        self.assertEqual(Decimal(body['shipping_cost']), Decimal('5.00'))
+        self.assertEqual(Decimal(body['bagtotal']), Decimal('35.00'))
+        self.assertEqual(body['items'][0]['product'], 'Tee - TEE-M')
+
+    def test_totals_are_memoized_until_invalidated(self):
+        CartItem.objects.create(cart=self.cart, product=self.variant, prod_quant=1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.cart.subtotal, Decimal('10.00'))
+            self.assertEqual(self.cart.bagtotal, Decimal('15.00'))
+
+        CartItem.objects.filter(cart=self.cart).update(prod_quant=2)
+        self.cart.invalidate_totals()
+        self.assertEqual(self.cart.subtotal, Decimal('20.00'))
+
+
+class CheckoutTests(CartTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = ProductItem.objects.create(
+            product=self.product, sku='TEE-L', current_price=Decimal('20.00'),
+            original_price=Decimal('20.00'), stock_quantity=10,
+        )
+
+    def checkout(self):
+        return self.client.post(f'/api/cartview/{self.cart.id}/checkout/')
+
+    def test_checkout_creates_order_and_decrements_stock(self):
+        CartItem.objects.create(cart=self.cart, product=self.variant, prod_quant=2)
+        CartItem.objects.create(cart=self.cart, product=self.other, prod_quant=3)
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 201)
+        order = response.json()['order']
+        self.assertEqual(Decimal(order['total_price']), Decimal('85.00'))
+        self.assertEqual(len(order['items']), 2)
+        self.variant.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.variant.stock_quantity, self.other.stock_quantity), (3, 7))
+        self.assertFalse(self.cart.items.exists())
+
+    def test_checkout_respects_other_carts_holds_and_releases_its_own(self):
+        self.add_item(3)
+        other_cart = self.other_cart()
+        StockHold.objects.create(cart=other_cart, product_item=self.variant, quantity=2,
+                                 expires_at=timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual(self.checkout().status_code, 201)
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock_quantity, 2)
+        self.assertFalse(StockHold.objects.filter(cart=self.cart).exists())
+
+        StockHold.objects.filter(cart=other_cart).update(quantity=3)
+        CartItem.objects.create(cart=self.cart, product=self.variant, prod_quant=1)
+        self.assertEqual(self.checkout().status_code, 400)
+
+    def test_retried_checkout_with_same_key_replays_the_order(self):
+        CartItem.objects.create(cart=self.cart, product=self.variant, prod_quant=2)
+
+        first = self.client.post(f'/api/cartview/{self.cart.id}/checkout/', HTTP_IDEMPOTENCY_KEY='abc')
+        retry = self.client.post(f'/api/cartview/{self.cart.id}/checkout/', HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Order.objects.count(), 1)
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock_quantity, 3)
+
+    def test_reused_key_with_a_different_request_is_rejected(self):
+        CartItem.objects.create(cart=self.cart, product=self.variant, prod_quant=2)
+        self.client.post(f'/api/cartview/{self.cart.id}/checkout/', HTTP_IDEMPOTENCY_KEY='abc')
+
+        response = self.client.post(f'/api/cartview/{self.cart.id}/checkout/', {'note': 'gift'},
+                                    HTTP_IDEMPOTENCY_KEY='abc')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_in_progress_key_conflicts_until_its_lock_times_out(self):
+        CartItem.objects.create(cart=self.cart, product=self.variant, prod_quant=2)
+        path = f'/api/cartview/{self.cart.id}/checkout/'
+        self.client.post(path, HTTP_IDEMPOTENCY_KEY='abc')
+        # As if the process handling the request had died before storing its response.
+        IdempotencyKey.objects.update(status_code=None, response_body=None)
+
+        self.assertEqual(self.client.post(path, HTTP_IDEMPOTENCY_KEY='abc').status_code, 409)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        reclaimed = self.client.post(path, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(reclaimed.json(), {'detail': 'Your cart is empty'})
+
+    def test_failed_checkout_releases_the_key(self):
+        CartItem.objects.create(cart=self.cart, product=self.variant, prod_quant=2)
+        path = f'/api/cartview/{self.cart.id}/checkout/'
+
+        with mock.patch('shopping.views.refresh_listings', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                self.client.post(path, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        with mock.patch('shopping.views.ProductItem.objects.filter') as stock_update:
+            stock_update.return_value.update.return_value = 0
+            conflict = self.client.post(path, HTTP_IDEMPOTENCY_KEY='abc')
+        self.assertEqual(conflict.status_code, 409)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        self.assertEqual(self.client.post(path, HTTP_IDEMPOTENCY_KEY='abc').status_code, 201)
+
+    def test_checkout_rejects_get(self):
+        self.assertEqual(self.client.get(f'/api/cartview/{self.cart.id}/checkout/').status_code, 405)
+
+    def test_checkout_is_all_or_nothing_when_a_sku_is_short(self):
+        CartItem.objects.create(cart=self.cart, product=self.variant, prod_quant=2)
+        CartItem.objects.create(cart=self.cart, product=self.other, prod_quant=11)
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 400)
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock_quantity, 5)
+        self.assertEqual(self.cart.items.count(), 2)
+        self.assertFalse(Order.objects.exists())
+
+
+class PromoPricingTests(CartTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        clear_caches()
+        now = timezone.now()
+        self.promo = PromoCode.objects.create(code='SAVE10', discount_present=Decimal('10.00'),
+                                              valid_from=now - timedelta(days=1), valid_until=now + timedelta(days=1))
+        self.add_item(3)
+
+    def apply(self, code):
+        return self.client.post(f'/api/cartview/{self.cart.id}/apply-promo/', {'code': code}, format='json')
+
+    def test_promo_discounts_cart_and_is_stored_on_the_order(self):
+        data = self.apply('SAVE10').json()['data']
+        self.assertEqual((data['discount'], data['cart_total']), (Decimal('3.00'), Decimal('32.00')))
+        for fast in (True, False):
+            with override_settings(FAST_READ_SERIALIZERS=fast):
+                cart = self.client.get(f'/api/cartview/{self.cart.id}/').json()
+            self.assertEqual((cart['discount'], cart['bagtotal']), ('3.00', '32.00'))
+
+        order = self.client.post(f'/api/cartview/{self.cart.id}/checkout/').json()['order']
+        self.assertEqual((order['subtotal'], order['discount_amount'], order['total_price']),
+                         ('30.00', '3.00', '32.00'))
+        self.assertEqual(order['promo_code'], self.promo.id)
+
+    def test_expired_or_deactivated_codes_do_not_apply(self):
+        self.assertEqual(self.apply('NOPE').status_code, 400)
+        self.assertEqual(self.apply('SAVE10').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            PromoCode.objects.filter(pk=self.promo.pk).update(is_active=False)
+            self.promo.save(update_fields=['code'])
+
+        self.assertEqual(self.client.get(f'/api/cartview/{self.cart.id}/').json()['discount'], '0.00')
+        order = self.client.post(f'/api/cartview/{self.cart.id}/checkout/').json()['order']
+        self.assertEqual((order['discount_amount'], order['promo_code']), ('0.00', None))
+
+
+class CategoryCacheTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+        ProductCategory.objects.create(name='Hats', quantity=3)
+
+    def test_list_is_served_from_cache_until_a_category_changes(self):
+        first = self.client.get('/api/category/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/category/')
+
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(cache_stats(['categories'])['categories'], {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductCategory.objects.create(name='Scarves', quantity=1)
+
+        self.assertEqual(len(self.client.get('/api/category/').json()), 2)
+
+    def test_versions_and_stats_survive_a_full_catalog_cache(self):
+        self.client.get('/api/category/')
+        version = get_version('catalog')
+        caches['default'].set_many({f'filler:{i}': i for i in range(caches['default']._max_entries + 10)})
+
+        self.assertEqual(get_version('catalog'), version)
+        self.assertEqual(cache_stats(['categories'])['categories']['misses'], 1)
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.client.get('/api/category/')['ETag']
+
+        response = self.client.get('/api/category/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+
+class OrderExportTests(CartTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        for quantity in (1, 2, 3):
+            order = Order.objects.create(user=self.user, shipping=self.address, shipping_cost=Decimal('5.00'),
+                                         total_price=Decimal('10.00') * quantity + Decimal('5.00'))
+            order.items.create(product_items=self.variant, quantity=quantity, price_at_purchase=Decimal('10.00'))
+        self.today = timezone.localdate()
+        self.client.force_authenticate(User.objects.create_superuser('finance@example.com', 'Fin', 'Ance', 'pass'))
+
+    def export(self, **params):
+        return self.client.get('/api/orders/export/', {'start': self.today, 'end': self.today, **params})
+
+    def test_csv_export_streams_one_line_per_item(self):
+        response = self.export()
+
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['order_id', 'created_at'])
+        self.assertEqual([line.split(',')[-5:] for line in lines[1:]],
+                         [['TEE-M', 'Tee', str(quantity), '10.00', f'{quantity * 10}.00'] for quantity in (1, 2, 3)])
+
+    def test_jsonl_export_prefetches_items_per_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            body = b''.join(self.export(output='jsonl').streaming_content)
+
+        self.assertEqual(len(queries), 2)
+        orders = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([order['items'][0]['quantity'] for order in orders], [1, 2, 3])
+        self.assertEqual(orders[0]['city'], 'Tashkent')
+
+    def test_export_requires_a_valid_range_and_staff(self):
+        self.assertEqual(self.export(start='nope').status_code, 400)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.export().status_code, 403)
+
+
+class FastJSONTests(TestCase):
+    def test_renderer_output_matches_drf_json_renderer(self):
+        data = {
+            'price': Decimal('12.50'), 'label': gettext_lazy('Pending'), 'when': timezone.now(),
+            'day': timezone.localdate(), 'wait': timedelta(minutes=1), 'name': 'Ko\u2028fta \u00e9', 3: [None, True],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json; indent=2'),
+                         JSONRenderer().render(data, 'application/json; indent=2'))
+
+    def test_parser_reads_json_and_rejects_invalid_bodies(self):
+        self.assertEqual(FastJSONParser().parse(io.BytesIO(b'{"quantity": 2}')), {'quantity': 2})
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(io.BytesIO(b'{"quantity": NaN}'))
+
+
+class CatalogImportTests(TestCase):
+    CSV = (
+        'sku,product,category,current_price,stock_quantity,color,size\n'
+        'JKT-S,Parka,Outerwear,80.00,3,Olive,S\n'
+        'JKT-M,Parka,Outerwear,80.00,0,Olive,M\n'
+        'CAP-1,Beanie,Accessories,15.00,9,,\n'
+    )
+
+    def run_import(self, text, fmt='csv', batch_size=2):
+        importer = CatalogImporter(batch_size)
+        importer.run(parse_rows(read_rows(io.StringIO(text), fmt)))
+        return importer
+
+    def test_import_creates_catalog_and_upserts_by_sku(self):
+        importer = self.run_import(self.CSV)
+
+        self.assertEqual((importer.rows, importer.products_created), (3, 2))
+        parka = Product.objects.select_related('listing', 'category').get(name='Parka')
+        self.assertEqual(parka.category.name, 'Outerwear')
+        self.assertEqual((parka.listing.total_stock, parka.listing.sizes), (3, ['S']))
+        self.assertIn('JKT-M', parka.search_document)
+
+        self.run_import('{"sku": "JKT-M", "product": "Parka", "category": "Outerwear", '
+                        '"current_price": "70.00", "stock_quantity": 4, "size": "M"}\n', fmt='jsonl')
+
+        self.assertEqual(Product.objects.filter(name='Parka').count(), 1)
+        item = ProductItem.objects.get(sku='JKT-M')
+        self.assertEqual((item.current_price, item.stock_quantity, item.color), (Decimal('70.00'), 4, None))
+        parka.listing.refresh_from_db()
+        self.assertEqual(parka.listing.total_stock, 7)
+
+    def test_invalid_row_reports_its_line(self):
+        with self.assertRaisesMessage(ValueError, 'line 3: stock_quantity'):
+            self.run_import(self.CSV.replace('80.00,0', '80.00,-1'))
+
+
+class BenchmarkToolTests(TestCase):
+    def test_seed_catalog_creates_the_requested_rows(self):
+        out = io.StringIO()
+        call_command('seed_catalog', categories=2, products=5, variants=3, users=2, prefix='t', stdout=out)
+
+        self.assertIn('Seeded 5 products', out.getvalue())
+        self.assertEqual(ProductCategory.objects.filter(name__startswith='t-category-').count(), 2)
+        products = Product.objects.filter(category__name__startswith='t-category-')
+        self.assertEqual(products.count(), 5)
+        self.assertEqual(ProductItem.objects.filter(sku__startswith='T-').count(), 15)
+        self.assertEqual(ProductListing.objects.filter(product__in=products).count(), 5)
+        self.assertEqual(Cart.objects.filter(user__email__startswith='t-user-').count(), 2)
+
+    def test_explain_views_reports_every_view(self):
+        out = io.StringIO()
+        call_command('explain_views', stdout=out)
+
+        for label, _, _ in EXPLAINED_VIEWS:
+            self.assertIn(f'{label}: ', out.getvalue())
+
+    def test_sequential_scans_flags_only_unindexed_sqlite_scans(self):
+        plan = '\n'.join([
+            'SCAN shopping_productcategory',
+            'SCAN shopping_product USING INDEX product_recent_idx',
+            'SCAN shopping_productitem USING COVERING INDEX variant_color_idx',
+            'SEARCH shopping_productlisting USING INDEX sqlite_autoindex_shopping_productlisting_1 (product_id=?)',
+            'SCAN CONSTANT ROW',
+        ])
+
+        self.assertEqual(sequential_scans(plan, vendor='sqlite'), ['SCAN shopping_productcategory'])
+
+
+class ProductSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shoes = ProductCategory.objects.create(name='Shoes', quantity=0)
+        red = Color.objects.create(name='Crimson')
+        cls.runner = Product.objects.create(name='Trail Runner', description='Grippy sole',
+                                            base_price=Decimal('80.00'), category=shoes)
+        cls.loafer = Product.objects.create(name='Leather Loafer', description='Runs small',
+                                            base_price=Decimal('90.00'), category=shoes)
+        ProductItem.objects.create(product=cls.loafer, sku='LOAF-42', current_price=Decimal('90.00'),
+                                   original_price=Decimal('90.00'), stock_quantity=1, color=red)
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+
+    def search(self, term):
+        return [row['id'] for row in self.client.get('/api/products/', {'search': term}).json()['results']]
+
+    def test_search_matches_prefixes_across_product_fields(self):
+        self.assertEqual(self.search('trail run'), [self.runner.id])
+        self.assertEqual(self.search('crims'), [self.loafer.id])
+        self.assertEqual(self.search('loaf-42'), [self.loafer.id])
+        self.assertCountEqual(self.search('run'), [self.runner.id, self.loafer.id])
+        self.assertEqual(self.search('boots'), [])
+
+    def test_suggest_returns_ranked_names(self):
+        response = self.client.get('/api/products/suggest/', {'q': 'leath'})
+
+        self.assertEqual(response.json(), [{'id': self.loafer.id, 'name': 'Leather Loafer'}])
+
+    def test_suggest_without_search_terms_returns_nothing(self):
+        for params in ({}, {'q': ''}, {'q': '   '}, {'q': '!!'}):
+            response = self.client.get('/api/products/suggest/', params)
+            self.assertEqual((response.status_code, response.json()), (200, []), params)
+
+
+class ProductFacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shirts = ProductCategory.objects.create(name='Shirts', quantity=0)
+        cls.red = Color.objects.create(name='Red')
+        cls.blue = Color.objects.create(name='Blue')
+        cls.small = Size.objects.create(name='S', size_type='CL')
+        cls.large = Size.objects.create(name='L', size_type='CL')
+        cls.polo = Product.objects.create(name='Polo', base_price=Decimal('30.00'), category=shirts)
+        cls.oxford = Product.objects.create(name='Oxford', base_price=Decimal('60.00'), category=shirts)
+        for product, sku, color, size, price, stock in (
+            (cls.polo, 'POLO-RS', cls.red, cls.small, '30.00', 3),
+            (cls.polo, 'POLO-BL', cls.blue, cls.large, '32.00', 0),
+            (cls.oxford, 'OXF-RL', cls.red, cls.large, '60.00', 5),
+        ):
+            ProductItem.objects.create(product=product, sku=sku, color=color, size=size, current_price=Decimal(price),
+                                       original_price=Decimal(price), stock_quantity=stock)
+
+    def setUp(self):
+        clear_caches()
+        self.client = APIClient()
+
+    def filter(self, **params):
+        return sorted(row['id'] for row in self.client.get('/api/products/', params).json()['results'])
+
+    def test_variant_filters_must_hold_on_one_variant(self):
+        self.assertEqual(self.filter(color=self.red.id), sorted([self.polo.id, self.oxford.id]))
+        self.assertEqual(self.filter(color=self.blue.id, in_stock='true'), [])
+        self.assertEqual(self.filter(color=self.blue.id, in_stock='Y'), [])  # same booleans as the importer
+        self.assertEqual(self.filter(color=self.red.id, size=self.large.id), [self.oxford.id])
+        self.assertEqual(self.filter(min_price='31', max_price='40'), [self.polo.id])
+        self.assertEqual(self.client.get('/api/products/', {'max_price': 'cheap'}).status_code, 400)
+
+    def test_facet_counts_ignore_their_own_filter_and_are_cached(self):
+        params = {'color': self.red.id, 'in_stock': 'true'}
+        with self.assertNumQueries(3):  # colors, sizes and the grouped facet counts
+            response = self.client.get('/api/products/facets/', params)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/products/facets/', params).json(), response.json())
+
+        counts = response.json()
+        self.assertEqual({row['name']: row['count'] for row in counts['colors']}, {'Red': 2})
+        self.assertEqual({row['name']: row['count'] for row in counts['sizes']}, {'S': 1, 'L': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductItem.objects.filter(sku='POLO-BL').update(stock_quantity=4)
+            ProductItem.objects.get(sku='POLO-BL').save()
+        counts = self.client.get('/api/products/facets/', params).json()
+        self.assertEqual({row['name']: row['count'] for row in counts['colors']}, {'Red': 2, 'Blue': 1})
+
+
+@override_settings(FAST_READ_SERIALIZERS=True)
+class FastReadSerializerTests(CartTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        Product.objects.create(name='Bare Tee', description='No variants', base_price=Decimal('7.50'),
+                               category=self.category)
+        self.add_item(2)
+
+    def assert_same_as_serializers(self, path):
+        fast = self.client.get(path)
+        with override_settings(FAST_READ_SERIALIZERS=False):
+            slow = self.client.get(path)
+        self.assertEqual(fast.status_code, 200)
+        self.assertEqual(fast.json(), slow.json())
+        return fast.json()
+
+    def test_product_lists_match_model_serializers(self):
+        self.assertEqual(len(self.assert_same_as_serializers('/api/products/?page_size=1')['results']), 1)
+        self.assert_same_as_serializers('/api/products/?search=tee')
+        self.assert_same_as_serializers('/api/clothes/')
+
+    def test_cart_reads_match_model_serializers(self):
+        self.assertEqual(self.assert_same_as_serializers(f'/api/cartview/{self.cart.id}/')['bagtotal'], '25.00')
+        self.assert_same_as_serializers('/api/cartview/')
+
+
+class ProductListingTests(CartTestMixin, TestCase):
+    def test_listing_tracks_variant_changes(self):
+        red = Color.objects.create(name='Red')
+        ProductItem.objects.create(product=self.product, sku='TEE-L', current_price=Decimal('14.00'),
+                                   original_price=Decimal('14.00'), stock_quantity=2, color=red)
+
+        self.add_item(5)
+
+        listing = Product.objects.select_related('listing').get(pk=self.product.pk).listing
+        self.assertEqual((listing.min_price, listing.max_price), (Decimal('10.00'), Decimal('14.00')))
+        self.assertEqual(listing.total_stock, 7)
+        self.assertTrue(listing.in_stock)
+        self.assertEqual(listing.colors, ['Red'])
+
+    def test_product_list_reads_listing_in_one_query(self):
+        self.client.get('/api/products/')  # caches the user's favorite IDs and the catalog version
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/')
+
+        row = response.json()['results'][0]
+        self.assertEqual((row['min_price'], row['in_stock']), ('10.00', True))
+
+
+class FavoritesTests(CartTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        clear_caches()
+        self.others = [Product.objects.create(name=f'Sock {i}', description='', base_price=Decimal('3.00'),
+                                              category=self.category) for i in range(3)]
+
+    def favorite(self, product):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/favorites/', {'product_id': product.id}, format='json')
+
+    def flags(self, path='/api/products/'):
+        return {row['id']: row['is_favorite'] for row in self.client.get(path).json()['results']}
+
+    def test_favorites_are_hydrated_in_one_query_and_flag_product_rows(self):
+        self.assertEqual(self.favorite(self.product).status_code, 201)
+        self.assertEqual(self.favorite(self.product).status_code, 400)
+        for product in self.others:
+            self.favorite(product)
+
+        self.client.get('/api/favorites/')
+        with self.assertNumQueries(1):
+            favorites = self.client.get('/api/favorites/').json()
+        self.assertEqual(len(favorites), 4)
+        self.assertTrue(all(favorite['product']['is_favorite'] for favorite in favorites))
+
+        self.assertEqual(set(self.flags().values()), {True})
+        self.assertTrue(self.client.get(f'/api/products/{self.product.id}/').json()['is_favorite'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/api/favorites/{favorites[-1]["id"]}/')
+        self.assertFalse(self.flags()[self.product.id])
+        with override_settings(FAST_READ_SERIALIZERS=False):
+            self.assertFalse(self.flags()[self.product.id])
+
+    def test_favoriting_changes_the_product_etag(self):
+        path = f'/api/products/{self.product.id}/'
+        etag = self.client.get(path)['ETag']
+        self.favorite(self.product)
+
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ConditionalProductTests(CartTestMixin, TestCase):
+    def revalidate(self, path, response):
+        with CaptureQueriesContext(connection) as queries:
+            again = self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag'])
+        return again.status_code, len(queries)
+
+    def test_product_detail_answers_304_until_product_variants_or_holds_change(self):
+        path = f'/api/products/{self.product.id}/'
+        first = self.client.get(path)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.revalidate(path, first), (304, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_item(1)
+        second = self.client.get(path)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.json()['variants'][0]['available_quantity'], 4)
+
+        self.variant.current_price = Decimal('9.00')
+        self.variant.save()
+        self.assertEqual(self.revalidate(path, second)[0], 200)
+        self.assertEqual(self.client.get('/api/products/0/').status_code, 404)
+
+    def test_category_rename_invalidates_product_list_etags(self):
+        path = '/api/products/?search=shirts'
+        first = self.client.get(path)
+        self.assertEqual(self.revalidate(path, first)[0], 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.name = 'Blouses'
+            self.category.save()
+
+        self.assertEqual(self.revalidate(path, first)[0], 200)
+
+    def test_product_list_answers_304_until_the_catalog_changes(self):
+        for name in ('Polo', 'Henley'):
+            Product.objects.create(name=name, description='', base_price=Decimal('20.00'), category=self.category)
+        path = self.client.get('/api/products/?page_size=1').json()['next']
+        first = self.client.get(path)
+        # A deep cursor page revalidates from the cached catalog version, without touching the catalog.
+        self.assertEqual(self.revalidate(path, first), (304, 0))
+        self.assertNotEqual(self.client.get('/api/products/?page_size=6')['ETag'], first['ETag'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(name='Oxford', description='', base_price=Decimal('20.00'), category=self.category)
+        second = self.client.get(path)
+        self.assertEqual(self.revalidate(path, first)[0], 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.current_price = Decimal('9.00')
+            self.variant.save()
+        self.assertEqual(self.revalidate(path, second)[0], 200)
+
+
+class RequestMetricsTests(CartTestMixin, TestCase):
+    @override_settings(DEBUG=True, FAST_READ_SERIALIZERS=True)
+    def test_debug_responses_carry_query_metrics(self):
+        response = self.client.get(f'/api/cartview/{self.cart.id}/')
+
+        self.assertEqual(response['X-Query-Count'], '2')
+        self.assertEqual(response['X-Response-Size'], str(len(response.content)))
+        self.assertGreater(float(response['X-Render-Time-Ms']), 0)
+        self.assertLessEqual(float(response['X-Render-Time-Ms']), float(response['X-App-Time-Ms']))
+        self.assertIn('render_ms', registry.snapshot()['cartview-detail'])
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_session_authenticated_reads_stay_within_budget(self):
+        client = APIClient()
+        client.login(email='buyer@example.com', password='pass')
+        for path in (f'/api/products/{self.product.id}/', '/api/products/', f'/api/cartview/{self.cart.id}/'):
+            self.assertEqual(client.get(path).status_code, 200, path)
+
+    @override_settings(QUERY_BUDGET_STRICT=True, QUERY_BUDGETS={'cartview-add-item': 2})
+    def test_strict_budget_fails_expensive_actions(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            self.add_item(1)
+
+
+class AsyncEndpointTests(CartTestMixin, TestCase):
+    async def test_async_product_list_pages_with_keyset_cursor(self):
+        for i in range(3):
+            await Product.objects.acreate(name=f'Extra {i}', description='', base_price=Decimal('1.00'),
+                                          category=self.category)
+
+        first = (await self.async_client.get('/api/async/products/', {'page_size': 2})).json()
+        second = (await self.async_client.get(first['next'])).json()
+
+        self.assertEqual([row['name'] for row in first['results']], ['Extra 2', 'Extra 1'])
+        self.assertEqual([row['name'] for row in second['results']], ['Extra 0', 'Tee'])
+        self.assertIsNone(second['next'])
+
+    async def test_async_product_detail_matches_sync_availability(self):
+        clear_caches()
+        await StockHold.objects.acreate(cart=self.cart, product_item=self.variant, quantity=2,
+                                        expires_at=timezone.now() + timedelta(minutes=5))
+        path = f'/products/{self.product.id}/'
+
+        response = await self.async_client.get(f'/api/async{path}')
+
+        self.assertEqual(response.json()['variants'][0]['available_quantity'], 3)
+        sync_response = await sync_to_async(self.client.get)(f'/api{path}')
+        self.assertEqual(response.json()['variants'], sync_response.json()['variants'])
+
+    @override_settings(DEBUG=True)
+    async def test_async_requests_count_their_queries(self):
+        response = await self.async_client.get(f'/api/async/products/{self.product.id}/')
+
+        self.assertGreater(int(response['X-Query-Count']), 0)
+        self.assertGreater(float(response['X-DB-Time-Ms']), 0)
+
+    async def test_async_cart_requires_a_session_and_reports_totals(self):
+        self.assertEqual((await self.async_client.get(f'/api/async/cartview/{self.cart.id}/')).status_code, 401)
+
+        await CartItem.objects.acreate(cart=self.cart, product=self.variant, prod_quant=2)
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(f'/api/async/cartview/{self.cart.id}/')
+
+        self.assertEqual(response.json()['bagtotal'], '25.00')
+
+
+class PaymentProcessingTests(CartTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = Order.objects.create(user=self.user, shipping=self.address, shipping_cost=Decimal('5.00'),
+                                          total_price=Decimal('15.00'))
+
+    def pay(self, status='PENDING'):
+        return self.client.post('/api/payment/', {
+            'order': self.order.id, 'type': 'CREDIT_CARD', 'method': 'PAYPAL_CARD',
+            'status': status, 'last_four': '4242', 'exp_date': '12/30',
+        }, format='json')
+
+    def test_payment_defers_order_processing_to_the_queue(self):
+        self.assertEqual(self.pay('COMPLETED').status_code, 201)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'P')
+        self.assertEqual(backlog()['pending'], 1)
+
+        while run_pending():
+            pass
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'A')
+        self.assertEqual(backlog(), {'pending': 0, 'running': 0, 'failed': 0, 'oldest_pending_age_s': 0})
+
+    def test_pending_payment_leaves_the_order_until_it_completes(self):
+        self.assertEqual(self.pay().status_code, 201)
+        self.assertEqual(backlog()['pending'], 0)
+
+        payment = self.order.payment
+        payment.status = 'COMPLETED'
+        payment.save()
+        while run_pending():
+            pass
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'A')
+
+    def test_order_history_is_cached_per_user_until_the_order_changes(self):
+        clear_caches()
+        self.client.get('/api/orderview/')
+        with self.assertNumQueries(0):
+            self.assertEqual(len(self.client.get('/api/orderview/').json()), 1)
+        self.assertEqual(cache_stats(['orders'])['orders']['hit_ratio'], 0.5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pay()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/orderview/')
+        self.assertTrue(queries)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(user=self.user, shipping=self.address, total_price=Decimal('9.00'))
+        self.assertEqual(len(self.client.get('/api/orderview/').json()), 2)
+        self.client.force_authenticate(self.other_cart().user)
+        self.assertEqual(self.client.get('/api/orderview/').json(), [])
@@ -1,8 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken import views
+
+from . import async_views
 from .views import ProductDetailView, ProductsView, CartViewSet, OrderViewSet, PersonalDetailViewSet, CardDetailViewSet, \
-    CategoryViewSet, CategoryProductsViewSet, PaymentView
+    CategoryViewSet, CategoryProductsViewSet, PaymentView, CacheStatsView, ProductSuggestView, \
+    MetricsView, OrderExportView, FavoritesViewSet, ProductFacetsView
 
 router = DefaultRouter()
 
@@ -13,6 +16,7 @@ router.register('category', CategoryViewSet, basename='category')
 router.register('clothes', CategoryProductsViewSet,basename='clothes')
 router.register('personaldetail', PersonalDetailViewSet, basename='personal-detail')
 router.register('card-detail', CardDetailViewSet, basename='card-detail')
+router.register('favorites', FavoritesViewSet, basename='favorites')
 
 
 
@@ -22,9 +26,18 @@ router.register('card-detail', CardDetailViewSet, basename='card-detail')
 urlpatterns = [
     path('', include(router.urls)),
     path('products/', ProductsView.as_view(), name='product-list'),
+    path('products/facets/', ProductFacetsView.as_view(), name='product-facets'),
+    path('products/suggest/', ProductSuggestView.as_view(), name='product-suggest'),
     path('products/<int:id>/', ProductDetailView.as_view(), name='product-detail'),
     # path('category/<str:category>/', .as_view(), name='category-products'),
     path('auth/', views.obtain_auth_token),
     path('payment/', PaymentView.as_view(), name='payment'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('orders/export/', OrderExportView.as_view(), name='order-export'),
+    path('async/products/', async_views.product_list, name='async-product-list'),
+    path('async/products/<int:id>/', async_views.product_detail, name='async-product-detail'),
+    path('async/category/', async_views.category_list, name='async-category-list'),
+    path('async/cartview/<int:pk>/', async_views.cart_detail, name='async-cartview-detail'),
 
 ]
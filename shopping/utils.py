@@ -0,0 +1,16 @@
+import itertools
+
+# Shared by query parameters (shopping.facets) and imported files
+# (shopping.catalog_import), so both read booleans the same way.
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+def parse_bool(value, default=False):
+    value = str(value).strip().lower() if value is not None else ''
+    return value in TRUE_VALUES if value else default
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
@@ -1,34 +1,135 @@
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Prefetch, Q, When
+from django.db.models.functions import Now
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import filters
+from django.utils.dateparse import parse_date
 from rest_framework import viewsets, generics, status
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError, NotFound
 from rest_framework.generics import CreateAPIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
 from accounts.models import User
+from .cache import cache_stats, get_or_load, get_version
+from .conditional import conditional_response, product_detail_validators, product_list_validators
+from .dbstats import connection_stats
+from .exports import EXPORT_FORMATS, date_range_bounds, stream_orders
+from .facets import ProductFacetFilter, facet_counts
+from .favorites import favorite_product_ids, favorites_version
+from .fast_serializers import CART_VALUES, cart_data, product_list_data, product_list_values
+from .idempotency import idempotent
+from .inventory import InsufficientStock, available_to_sell, held_quantities, release_cart_holds, reserve, set_hold
+from .listing import refresh_listings
+from .metrics import registry
 from .models import Product, ProductItem, Cart, CartItem, Order, OrderItem, Favorite, ShippingAddress, PaymentCard, \
     ProductCategory
+from .pagination import ProductCursorPagination
+from .pricing import active_promo, price_lines
+from .search import ProductSearchFilter, search_products, tokenize
 from .serializers import CartSerializer, OrderSerializer, ProductListSerializer, ProductDetailSerializer, \
     AddItemSerializer, FavouriteSerializer, ShippingAddressSerializer, UserInfoSerializer, CardDetailSerializer, \
-    ReduceItemSerializer, ProductCategorySerializer, PaymentSerializer
+    ReduceItemSerializer, ProductCategorySerializer, PaymentSerializer, ApplyPromoSerializer
+from .taskqueue import backlog
 
 
-class ProductsView(generics.ListAPIView):
-    queryset = Product.objects.all()
+def order_detail_queryset():
+    return Order.objects.select_related('shipping').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related(
+            'product_items__product', 'product_items__color', 'product_items__size'
+        ))
+    )
+
+
+class CheckoutError(Exception):
+    status_code = status.HTTP_400_BAD_REQUEST
+
+
+class CheckoutConflict(CheckoutError):
+    # Nothing was written; a retry, even with the same Idempotency-Key, may succeed.
+    status_code = status.HTTP_409_CONFLICT
+
+
+class FavoriteFlagMixin:
+    # Serializers mark is_favorite from the user's cached favorite IDs.
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['favorite_ids'] = favorite_product_ids(self.request.user)
+        return context
+
+
+class ConditionalProductListMixin:
+    # Answers 304 from the cached catalog version before the page is queried.
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = product_list_validators(request.query_params.urlencode(),
+                                                      favorites_version(request.user))
+        return conditional_response(request, etag, last_modified,
+                                    lambda: super(ConditionalProductListMixin, self).list(request, *args, **kwargs))
+
+
+class FastProductListMixin:
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_READ_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        queryset = product_list_values(self.filter_queryset(self.get_queryset()))
+        return self.get_paginated_response(
+            product_list_data(self.paginate_queryset(queryset), favorite_product_ids(request.user))
+        )
+
+
+class ProductsView(ConditionalProductListMixin, FastProductListMixin, FavoriteFlagMixin, generics.ListAPIView):
+    queryset = Product.objects.filter(is_active=True).select_related('listing')
     serializer_class = ProductListSerializer
-    filter_backends = [filters.SearchFilter]
-    search_fields = ["name"]
+    pagination_class = ProductCursorPagination
+    filter_backends = [ProductSearchFilter, ProductFacetFilter]
+
+
+class ProductFacetsView(generics.GenericAPIView):
+    # Color and size counts for the same filters as the product list.
+    queryset = Product.objects.filter(is_active=True)
+    filter_backends = [ProductSearchFilter]
+
+    def get(self, request, *args, **kwargs):
+        search = ProductSearchFilter().get_search_term(request)
+        return Response(facet_counts(self.filter_queryset(self.get_queryset()), request.query_params, search))
+
+
+class ProductSuggestView(generics.GenericAPIView):
+    suggestion_limit = 10
 
+    def get(self, request, *args, **kwargs):
+        term = request.query_params.get('q', '')
+        if not tokenize(term):
+            return Response([])
+        products = search_products(Product.objects.filter(is_active=True), term)
+        return Response(list(
+            products.order_by('-search_rank', '-id').values('id', 'name')[:self.suggestion_limit]
+        ))
 
-class ProductDetailView(generics.RetrieveAPIView):
-    queryset = Product.objects.all()
+
+class ProductDetailView(FavoriteFlagMixin, generics.RetrieveAPIView):
+    queryset = Product.objects.select_related('category', 'listing').prefetch_related(
+        Prefetch('variants', queryset=ProductItem.objects.select_related('color', 'size'))
+    )
     serializer_class = ProductDetailSerializer
     lookup_field = 'id'
 
+    def retrieve(self, request, *args, **kwargs):
+        validators = product_detail_validators(kwargs[self.lookup_field], favorites_version(request.user))
+        if validators is None:
+            raise Http404('No Product matches the given query.')
+
+        def build_response():
+            instance = self.get_object()
+            context = self.get_serializer_context()
+            context['availability'] = available_to_sell([variant.id for variant in instance.variants.all()])
+            return Response(self.get_serializer(instance, context=context).data)
+
+        return conditional_response(request, *validators, build_response)
+
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ProductCategorySerializer
@@ -36,14 +137,73 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     def get_queryset(self):
         return ProductCategory.objects.all()
 
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, 'list', self.get_queryset, many=True)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, f'detail:{kwargs[self.lookup_field]}', self.get_object)
 
-class CategoryProductsViewSet(viewsets.ReadOnlyModelViewSet):
+    def _cached_response(self, request, name, load_instance, many=False):
+        version = get_version('categories')
+
+        def build_response():
+            data, _ = get_or_load(
+                'categories', name, lambda: self.get_serializer(load_instance(), many=many).data
+            )
+            return Response(data)
+
+        return conditional_response(request, f'categories-{name}-{version}', version / 1e6, build_response)
+
+
+class CacheStatsView(generics.GenericAPIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return Response(cache_stats())
+
+
+class MetricsView(generics.GenericAPIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'endpoints': registry.snapshot(),
+            'cache': cache_stats(),
+            'database': connection_stats(),
+            'tasks': backlog(),
+        })
+
+
+class OrderExportView(generics.GenericAPIView):
+    permission_classes = (IsAdminUser,)
+    content_types = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+    def get(self, request, *args, **kwargs):
+        start = parse_date(request.query_params.get('start', ''))
+        end = parse_date(request.query_params.get('end', ''))
+        if start is None or end is None or start > end:
+            raise ValidationError({'detail': 'Pass start and end as YYYY-MM-DD, start not after end'})
+        # Not "format": DRF reserves that for renderer negotiation.
+        fmt = request.query_params.get('output', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            raise ValidationError({'output': f'Choose one of {", ".join(EXPORT_FORMATS)}'})
+
+        response = StreamingHttpResponse(stream_orders(fmt, *date_range_bounds(start, end)),
+                                         content_type=self.content_types[fmt])
+        response['Content-Disposition'] = f'attachment; filename="orders-{start}-{end}.{fmt}"'
+        return response
+
+
+class CategoryProductsViewSet(ConditionalProductListMixin, FastProductListMixin, FavoriteFlagMixin,
+                              viewsets.ReadOnlyModelViewSet):
     serializer_class = ProductListSerializer
+    pagination_class = ProductCursorPagination
+    filter_backends = [ProductFacetFilter]
 
     category = 1
 
     def get_queryset(self):
-        return Product.objects.filter(category=self.category)
+        return Product.objects.filter(category=self.category, is_active=True).select_related('listing')
 
 
 class ClothesCategory(CategoryProductsViewSet):
@@ -56,7 +216,23 @@ class CartViewSet(viewsets.ModelViewSet):
     permission_classes = (AllowAny,)
 
     def get_queryset(self):
-        return Cart.objects.filter(user=self.request.user)
+        queryset = Cart.objects.filter(user=self.request.user).select_related('shipping')
+        if self.action in ('list', 'retrieve') and not settings.FAST_READ_SERIALIZERS:
+            queryset = queryset.prefetch_related(
+                Prefetch('items', queryset=CartItem.objects.select_related('product__product'))
+            )
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_READ_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        return Response(cart_data(list(self.get_queryset().values(*CART_VALUES))))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.FAST_READ_SERIALIZERS:
+            return super().retrieve(request, *args, **kwargs)
+        cart = get_object_or_404(self.get_queryset().values(*CART_VALUES), pk=kwargs[self.lookup_field])
+        return Response(cart_data([cart])[0])
 
     @action(detail=True, methods=['post'], url_path='add-item')
     def add_item(self, request, pk=None):
@@ -64,47 +240,30 @@ class CartViewSet(viewsets.ModelViewSet):
         serializer = AddItemSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        try:
-            with transaction.atomic():
-                product_id = serializer.validated_data['product_id']
-                quantity = serializer.validated_data['quantity']
-
-                product = ProductItem.objects.get(id=product_id)
+        product_id = serializer.validated_data['product_id']
+        quantity = serializer.validated_data['quantity']
 
-                if quantity <= 0:
-                    raise ValidationError({"quantity": "Must be positive number"})
+        with transaction.atomic():
+            # Stock is only held here; it is decremented at checkout.
+            try:
+                reserve(cart, product_id, quantity)
+            except ProductItem.DoesNotExist:
+                raise NotFound(detail="Product not found")
+            except InsufficientStock as exc:
+                raise ValidationError({"stock": f"Only {exc.available} available"})
+            cart.invalidate_totals()
 
-                if product.stock_quantity < quantity:
-                    raise ValidationError(
-                        {"stock": f"Only {product.stock_quantity} available"},
-                        code=status.HTTP_400_BAD_REQUEST
-                    )
-
-                cart_item, created = CartItem.objects.get_or_create(
-                    cart=cart,
-                    product=product,
-                    defaults={'prod_quant': quantity}
-                )
-
-                if not created:
-                    cart_item.prod_quant += quantity
-                    cart_item.save()
+            cart_item = CartItem.objects.select_related('product').get(cart=cart, product_id=product_id)
 
-                product.stock_quantity -= quantity
-                product.save()
-
-                return Response({
-                    "status": "success",
-                    "data": {
-                        "item_id": cart_item.id,
-                        "quantity": cart_item.prod_quant,
-                        "subtotal": cart_item.subtotal,
-                        "cart_total": cart.bagtotal
-                    }
-                }, status=status.HTTP_200_OK)
-
-        except ProductItem.DoesNotExist:
-            raise NotFound(detail="Product not found")
+            return Response({
+                "status": "success",
+                "data": {
+                    "item_id": cart_item.id,
+                    "quantity": cart_item.prod_quant,
+                    "subtotal": cart_item.subtotal,
+                    "cart_total": cart.bagtotal
+                }
+            }, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], url_path='remove-item')
     def reduce_item(self, request, pk=None):
@@ -121,7 +280,7 @@ class CartViewSet(viewsets.ModelViewSet):
                     raise ValidationError({"quantity": "Must be positive number"})
 
                 product = ProductItem.objects.get(id=product_id)
-                cart_item = CartItem.objects.get(
+                cart_item = CartItem.objects.select_for_update().get(
                     cart=cart,
                     product=product
                 )
@@ -135,8 +294,8 @@ class CartViewSet(viewsets.ModelViewSet):
                 else:
                     cart_item.save()
 
-                product.stock_quantity += quantity
-                product.save()
+                set_hold(cart, product.id, cart_item.prod_quant)
+                cart.invalidate_totals()
 
                 return Response({
                     "status": "success",
@@ -152,11 +311,38 @@ class CartViewSet(viewsets.ModelViewSet):
         except Exception as e:
             raise ValidationError(detail=str(e))
 
-    @action(detail=True, methods=['get', 'post'])
+    @action(detail=True, methods=['post', 'delete'], url_path='apply-promo')
+    def apply_promo(self, request, pk=None):
+        cart = self.get_object()
+        if request.method == 'DELETE':
+            promo = None
+        else:
+            serializer = ApplyPromoSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            promo = active_promo(code=serializer.validated_data['code'])
+            if promo is None:
+                raise ValidationError({"code": "Invalid or expired promo code"})
+
+        Cart.objects.filter(pk=cart.pk).update(promo_code_id=promo.id if promo else None)
+        cart.promo_code_id = promo.id if promo else None
+        cart.invalidate_totals()
+        return Response({
+            "status": "success",
+            "data": {
+                "promo_code": promo.code if promo else None,
+                "subtotal": cart.subtotal,
+                "discount": cart.discount,
+                "cart_total": cart.bagtotal
+            }
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    @idempotent('checkout')
     def checkout(self, request, pk=None):
         cart = self.get_object()
+        quantities = dict(cart.items.values_list('product_id', 'prod_quant'))
 
-        if not cart.items.exists():
+        if not quantities:
             return Response(
                 {'detail': 'Your cart is empty'},
                 status=400
@@ -166,52 +352,78 @@ class CartViewSet(viewsets.ModelViewSet):
 
             with transaction.atomic():
 
+                # Lock every SKU in the cart up front, in id order, so
+                # concurrent checkouts over overlapping carts cannot deadlock.
+                products = {
+                    product.id: product
+                    for product in ProductItem.objects.select_for_update(of=('self',)).select_related('product')
+                    .filter(id__in=quantities).order_by('id')
+                }
+
+                held_by_others = held_quantities(quantities, exclude_cart=cart)
+                for product_id, quantity in quantities.items():
+                    if products[product_id].stock_quantity - held_by_others.get(product_id, 0) < quantity:
+                        raise CheckoutError(f"Not enough stock for {products[product_id].product.name}")
+
+                pricing = price_lines(
+                    ((quantity, products[product_id].current_price) for product_id, quantity in quantities.items()),
+                    active_promo(cart.promo_code_id),
+                )
+                shipping_cost = cart.shipping.shipping_cost
+
                 order = Order.objects.create(
                     user=request.user,
                     shipping=cart.shipping,
-                    promo_code=cart.promo_code,
+                    promo_code_id=pricing.promo.id if pricing.promo else None,
                     status='P',
-                    shipping_cost=cart.shipping_cost,
-                    total_price=cart.bagtotal
+                    shipping_cost=shipping_cost,
+                    subtotal=pricing.subtotal,
+                    discount_amount=pricing.discount,
+                    total_price=pricing.subtotal - pricing.discount + shipping_cost
                 )
 
-                order_items = []
-                for cart_item in cart.items.all():
-
-                    if cart_item.product.stock_quantity < cart_item.prod_quant:
-                        raise Exception(f"Not enough stock for {cart_item.product.name}")
-
-                    order_item = OrderItem.objects.create(
+                OrderItem.objects.bulk_create([
+                    OrderItem(
                         order=order,
-                        product_items=cart_item.product,
-                        quantity=cart_item.prod_quant,
-                        price_at_purchase=cart_item.product.current_price,
+                        product_items=products[product_id],
+                        quantity=quantity,
+                        price_at_purchase=products[product_id].current_price,
                     )
-                    order_items.append(order_item)
-
-                    cart_item.product.stock_quantity -= cart_item.prod_quant
-                    cart_item.product.save()
-
+                    for product_id, quantity in quantities.items()
+                ])
+
+                in_stock = Q()
+                for product_id, quantity in quantities.items():
+                    in_stock |= Q(id=product_id, stock_quantity__gte=quantity)
+                updated = ProductItem.objects.filter(in_stock).update(stock_quantity=Case(
+                    *[When(id=product_id, then=F('stock_quantity') - quantity)
+                      for product_id, quantity in quantities.items()]
+                ), updated_at=Now())
+                if updated != len(quantities):
+                    raise CheckoutConflict("Stock changed during checkout, please try again")
+                refresh_listings({product.product_id for product in products.values()})
+
+                release_cart_holds(cart, quantities)
                 cart.items.all().delete()
 
-                serializer = OrderSerializer(order)
+            serializer = OrderSerializer(order_detail_queryset().get(pk=order.pk))
 
-                return Response(
-                    {
-                        "success": True,
-                        "order": serializer.data,
-                        "message": "Order successfully created!"
-                    },
-                    status=201
-                )
+            return Response(
+                {
+                    "success": True,
+                    "order": serializer.data,
+                    "message": "Order successfully created!"
+                },
+                status=201
+            )
 
-        except Exception as e:
+        except CheckoutError as e:
             return Response(
                 {
                     "success": False,
                     "detail": f"An error occurred during checkout: {str(e)}"
                 },
-                status=400
+                status=e.status_code
             )
 
 
@@ -221,14 +433,41 @@ class OrderViewSet(viewsets.ModelViewSet):
     permission_classes = (AllowAny,)
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return order_detail_queryset().filter(user=self.request.user).order_by('-created_at')
+
+    # Reads are served from a per-user cache whose version is bumped on
+    # every order, order item, payment or address write of that user.
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, f'list:{request.query_params.urlencode()}',
+                            lambda: super(OrderViewSet, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(request, f'detail:{kwargs[self.lookup_field]}',
+                            lambda: super(OrderViewSet, self).retrieve(request, *args, **kwargs))
+
+    def _cached(self, request, name, respond):
+        if not request.user.is_authenticated:
+            return respond()
+        data, _ = get_or_load('orders', name, lambda: respond().data, timeout=settings.ORDER_CACHE_TIMEOUT,
+                              scope=request.user.pk)
+        return Response(data)
 
 
-class FavoritesViewSet(viewsets.ModelViewSet):
+class FavoritesViewSet(FavoriteFlagMixin, viewsets.ModelViewSet):
     serializer_class = FavouriteSerializer
+    permission_classes = (IsAuthenticated,)
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
 
     def get_queryset(self):
-        return Favorite.objects.filter(user=self.request.user)
+        # One joined query hydrates every favorite with its product listing.
+        return Favorite.objects.filter(user=self.request.user).select_related('product__listing')
+
+    def perform_create(self, serializer):
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            raise ValidationError({"product_id": "Product is already in favorites"})
 
 
 class ShippingViewSet(viewsets.ModelViewSet):
@@ -263,13 +502,17 @@ class CardDetailViewSet(viewsets.ModelViewSet):
 class PaymentView(CreateAPIView):
     serializer_class = PaymentSerializer
 
+    @idempotent('payment')
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
             order = serializer.validated_data.get('order')
             get_object_or_404(Order, id=order.id)
 
-            payment = serializer.save()
+            # Post-payment work is queued in the same transaction and run by
+            # the task workers, so the response does not wait for it.
+            with transaction.atomic():
+                payment = serializer.save()
             return Response({
                 'message': 'Payment successful',
                 'payment_id': payment.id